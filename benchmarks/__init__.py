@@ -0,0 +1 @@
+"""Benchmarks of the HottoH integration."""
@@ -0,0 +1,136 @@
+"""Measure what the recorder writes for one stove.
+
+Run with ``pytest benchmarks/test_recorder_volume.py``. A simulated stove
+sends FRAMES frames while every state_changed event is encoded the way the
+recorder does, then the volume is extrapolated to a stove-day of frames
+every STEADY_INTERVAL seconds. The ``extra_info`` of the case holds:
+
+- state_rows_per_day: rows added to the states table
+- attributes_bytes_per_day: attributes encoded by the recorder, once per
+  state row
+- attributes_rows_bytes: bytes of the attributes rows added during the
+  run, the recorder stores every distinct set of attributes once, so they
+  follow the setpoint_changes rather than the frames
+- the same for all attributes, in unfiltered_*, as they were recorded
+  before the sensors declared their unrecorded attributes
+
+The row overhead and indexes of the database are not counted. The timed
+function encodes the attributes of every sensor of the stove once.
+"""
+
+import asyncio
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.components.recorder.db_schema import (
+    ALL_DOMAIN_EXCLUDE_ATTRS,
+    StateAttributes,
+)
+from homeassistant.const import CONF_PORT, EVENT_STATE_CHANGED
+from homeassistant.core import Event, callback
+from homeassistant.helpers.json import json_bytes
+
+from custom_components.hottoh.const import (
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DOMAIN,
+    HOTTOH_SESSION,
+)
+from custom_components.hottoh.coordinator import STEADY_INTERVAL
+
+from tests.const import MOCK_CONFIG
+from tests.simulator import INDEX_ROOM_1_SET, StoveSimulator
+
+FRAME_INTERVAL = 0.02
+FRAMES = 200
+SETPOINT_PERIOD = 50
+
+
+async def test_recorder_volume(hass, socket_enabled, benchmark):
+    """Measure the recorder volume of a stove-day."""
+    async with StoveSimulator(tick_interval=FRAME_INTERVAL) as simulator:
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+            options={
+                CONF_MIN_INTERVAL: FRAME_INTERVAL,
+                CONF_MAX_INTERVAL: FRAME_INTERVAL,
+            },
+            entry_id="test",
+        )
+        config_entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+
+        rows = 0
+        recorded = {"bytes": 0, "rows_bytes": 0, "hashes": set()}
+        unfiltered = {"bytes": 0, "rows_bytes": 0, "hashes": set()}
+
+        def _count(volume, attributes):
+            volume["bytes"] += len(attributes)
+            if (key := StateAttributes.hash_shared_attrs_bytes(attributes)) not in (
+                volume["hashes"]
+            ):
+                volume["hashes"].add(key)
+                volume["rows_bytes"] += len(attributes)
+
+        @callback
+        def _state_changed(event):
+            nonlocal rows
+            state = event.data["new_state"]
+            if state is None or not state.entity_id.startswith("sensor."):
+                return
+            rows += 1
+            _count(recorded, StateAttributes.shared_attrs_bytes_from_event(event, None))
+            _count(
+                unfiltered,
+                json_bytes(
+                    {
+                        key: value
+                        for key, value in state.attributes.items()
+                        if key not in ALL_DOMAIN_EXCLUDE_ATTRS
+                    }
+                ),
+            )
+
+        unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+        start = client.stats.frames
+        setpoint = int(simulator.data[INDEX_ROOM_1_SET])
+        setpoint_changes = 0
+        while (frames := client.stats.frames - start) < FRAMES:
+            if frames // SETPOINT_PERIOD > setpoint_changes:
+                setpoint_changes += 1
+                setpoint += 5
+                simulator.data[INDEX_ROOM_1_SET] = str(setpoint)
+            await asyncio.sleep(FRAME_INTERVAL / 2)
+        frames = client.stats.frames - start
+        unsub()
+
+        events = [
+            Event(EVENT_STATE_CHANGED, {"new_state": state})
+            for state in hass.states.async_all("sensor")
+        ]
+
+        def _encode_all():
+            for event in events:
+                StateAttributes.shared_attrs_bytes_from_event(event, None)
+
+        benchmark(_encode_all)
+        per_day = 86400 / STEADY_INTERVAL / frames
+        benchmark.extra_info.update(
+            {
+                "frames": frames,
+                "state_rows_per_day": round(rows * per_day),
+                "attributes_bytes_per_day": round(recorded["bytes"] * per_day),
+                "setpoint_changes": setpoint_changes,
+                "attributes_rows_bytes": recorded["rows_bytes"],
+                "unfiltered_attributes_bytes_per_day": round(
+                    unfiltered["bytes"] * per_day
+                ),
+                "unfiltered_attributes_rows_bytes": unfiltered["rows_bytes"],
+            }
+        )
+
+        assert recorded["bytes"] < unfiltered["bytes"]
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
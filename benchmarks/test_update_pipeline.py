@@ -0,0 +1,168 @@
+"""Benchmark the update pipeline of the HottoH integration.
+
+Run with ``pytest benchmarks --benchmark-json=benchmark.json``, the metrics
+below are saved in the ``extra_info`` of each case. Every case sets up
+stoves simulated on local ports, one config entry each, then measures over
+WINDOW seconds:
+
+- state_writes_per_s: state_changed events fired by the entities
+- loop_lag_max_ms, loop_lag_p99_ms: how late a 10 ms timer wakes up
+- threads: threads alive during the window, before setup in threads_before
+- cpu_ms_per_update: process CPU time per coordinator update of one stove
+- memory_kib_per_entity: memory allocated by the setup, per entity
+
+The polling mode of the coordinator is the baseline, polling at the frame
+rate of the stoves so both modes see the same data. The simulated stoves
+share the process and its event loop, so absolute numbers include their
+cost, and the memory of the first case includes the import of the
+integration; compare modes and revisions on the same machine. The timed
+function updates every stove the way its mode does: a refresh of the
+coordinator as its timer runs it when polling, the frame listeners as the
+client calls them when pushing. It is scheduled on the event loop from the
+thread of the benchmark, a hop both modes pay alike.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+import threading
+import time
+import tracemalloc
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_PORT, EVENT_STATE_CHANGED
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.hottoh.const import (
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_PUSH_UPDATES,
+    COORDINATOR,
+    DOMAIN,
+)
+
+from tests.const import MOCK_CONFIG
+from tests.simulator import INDEX_ROOM_1, StoveSimulator
+
+FRAME_INTERVAL = 0.2
+WINDOW = 3.0
+LAG_TIMER = 0.01
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+@pytest.mark.parametrize("stoves", [1, 10, 50])
+@pytest.mark.parametrize("push", [False, True], ids=["poll", "push"])
+async def test_update_pipeline(hass, socket_enabled, benchmark, stoves, push):
+    """Measure the cost of keeping stoves up to date."""
+    threads_before = threading.active_count()
+    async with AsyncExitStack() as stack:
+        simulators = [
+            await stack.enter_async_context(
+                StoveSimulator(
+                    manufacturer=100 + index, tick_interval=FRAME_INTERVAL, seed=index
+                )
+            )
+            for index in range(stoves)
+        ]
+
+        tracemalloc.start()
+        for index, simulator in enumerate(simulators):
+            config_entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+                options={
+                    CONF_PUSH_UPDATES: push,
+                    CONF_MIN_INTERVAL: FRAME_INTERVAL,
+                    CONF_MAX_INTERVAL: FRAME_INTERVAL,
+                },
+                entry_id=f"stove_{index}",
+            )
+            config_entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        entities = len(er.async_get(hass).entities)
+        assert len(hass.states.async_all("climate")) == stoves
+        coordinators = [
+            hass.data[DOMAIN][f"stove_{index}"][COORDINATOR] for index in range(stoves)
+        ]
+        updates = 0
+        for coordinator in coordinators:
+            update_listeners = coordinator.async_update_listeners
+
+            def _counted(update_listeners=update_listeners):
+                nonlocal updates
+                updates += 1
+                update_listeners()
+
+            coordinator.async_update_listeners = _counted
+
+        state_writes = 0
+
+        @callback
+        def _state_changed(event):
+            nonlocal state_writes
+            state_writes += 1
+
+        unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+
+        lags = []
+        running = True
+
+        async def _lag_timer():
+            while running:
+                start = time.perf_counter()
+                await asyncio.sleep(LAG_TIMER)
+                lags.append(time.perf_counter() - start - LAG_TIMER)
+
+        timer = asyncio.create_task(_lag_timer())
+        cpu_start = time.process_time()
+        await asyncio.sleep(WINDOW)
+        cpu = time.process_time() - cpu_start
+        threads = threading.active_count()
+        window_updates = updates
+        running = False
+        await timer
+        unsub()
+
+        async def _async_update_all():
+            for coordinator in coordinators:
+                client = coordinator.api.client
+                client._data[INDEX_ROOM_1] = str(int(client._data[INDEX_ROOM_1]) ^ 1)
+                if push:
+                    for listener in list(client._frame_listeners):
+                        listener()
+                else:
+                    await coordinator.async_refresh()
+
+        def _update_all():
+            asyncio.run_coroutine_threadsafe(_async_update_all(), hass.loop).result()
+
+        await hass.async_add_executor_job(benchmark, _update_all)
+        benchmark.extra_info.update(
+            {
+                "stoves": stoves,
+                "mode": "push" if push else "poll",
+                "entities": entities,
+                "updates": window_updates,
+                "state_writes_per_s": round(state_writes / WINDOW, 1),
+                "loop_lag_max_ms": round(max(lags) * 1000, 2),
+                "loop_lag_p99_ms": round(_percentile(lags, 99) * 1000, 2),
+                "threads_before": threads_before,
+                "threads": threads,
+                "cpu_ms_per_update": round(cpu * 1000 / max(window_updates, 1), 3),
+                "memory_kib_per_entity": round(memory / 1024 / entities, 1),
+            }
+        )
+
+        assert window_updates > 0
+        for config_entry in hass.config_entries.async_entries(DOMAIN):
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
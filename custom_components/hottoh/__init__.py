@@ -3,24 +3,48 @@
 from __future__ import annotations
 
 import asyncio
-from datetime import timedelta
 import logging
-import async_timeout
 
 from homeassistant import exceptions
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    ATTR_DEVICE_ID,
     CONF_HOST,
     CONF_PORT,
     CONF_NAME,
     EVENT_HOMEASSISTANT_STOP,
 )
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.entity import Entity
-
-from .const import DOMAIN, PLATFORMS, HOTTOH_SESSION, CANCEL_STOP
-from hottohpy import Hottoh, HottohConnectionError
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_CONFIG_ENTRY_ID,
+    DOMAIN,
+    PLATFORMS,
+    PLATFORM_CAPABILITIES,
+    FORWARDED_PLATFORMS,
+    HOTTOH_SESSION,
+    CANCEL_STOP,
+    COORDINATOR,
+    SESSION_CACHE,
+    SESSION_CACHE_TIMEOUT,
+    CONF_PUSH_UPDATES,
+    CONF_CONFIRM_TIMEOUT,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DEFAULT_CONFIRM_TIMEOUT,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+)
+from .capture import FrameCapture
+from .client import create_hottoh
+from .coordinator import HottohDataUpdateCoordinator, capabilities_store
+from hottohpy import HottohConnectionError
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,16 +57,51 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up HottoH from a config entry."""
 
-    hottoh = Hottoh(
+    # Adopt the session validated by the config flow, if still alive
+    hottoh = async_pop_session(
+        hass, config_entry.data[CONF_HOST], config_entry.data[CONF_PORT]
+    ) or create_hottoh(
         address=config_entry.data[CONF_HOST],
         port=config_entry.data[CONF_PORT],
     )
 
-    try:
-        if not await async_connect_or_timeout(hass, hottoh):
-            return False
-    except CannotConnect as err:
-        raise exceptions.ConfigEntryNotReady from err
+    coordinator = HottohDataUpdateCoordinator(
+        hass,
+        config_entry,
+        hottoh,
+        push=config_entry.options.get(CONF_PUSH_UPDATES, True),
+        confirm_timeout=config_entry.options.get(
+            CONF_CONFIRM_TIMEOUT, DEFAULT_CONFIRM_TIMEOUT
+        ),
+        min_interval=config_entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        max_interval=config_entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+    )
+    if await coordinator.async_load_capabilities():
+        # Known stove, its entities are created right away and stay
+        # unavailable until it answers
+        if not hottoh.is_connected():
+            hottoh.connect()
+        config_entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh_capabilities(),
+            f"hottoh refresh capabilities {config_entry.entry_id}",
+        )
+    else:
+        # The client runs from the first connection on, stop it on failure
+        try:
+            await async_connect_or_timeout(hass, hottoh)
+            await coordinator.async_config_entry_first_refresh()
+        except CannotConnect as err:
+            await async_disconnect_or_timeout(hass, hottoh)
+            raise exceptions.ConfigEntryNotReady from err
+        except exceptions.ConfigEntryNotReady:
+            await async_disconnect_or_timeout(hass, hottoh)
+            raise
+        await coordinator.async_save_capabilities()
+    config_entry.async_on_unload(coordinator.async_watch_connection())
+    if coordinator.push:
+        coordinator.async_start_push()
+        config_entry.async_on_unload(coordinator.async_stop_push)
 
     async def _async_disconnect_hottoh(event):
         await async_disconnect_or_timeout(hass, hottoh)
@@ -51,65 +110,87 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
         EVENT_HOMEASSISTANT_STOP, _async_disconnect_hottoh
     )
 
+    platforms = async_stove_platforms(coordinator.capabilities)
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][config_entry.entry_id] = {
         HOTTOH_SESSION: hottoh,
+        COORDINATOR: coordinator,
         CANCEL_STOP: cancel_stop,
+        FORWARDED_PLATFORMS: platforms,
     }
 
-    # for component in PLATFORMS:
-    #     hass.async_create_task(
-    #         hass.config_entries.async_forward_entry_setups(config_entry, component)
-    #     )
-    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    await hass.config_entries.async_forward_entry_setups(config_entry, platforms)
 
     if not config_entry.update_listeners:
         config_entry.add_update_listener(async_update_options)
 
-    def stoveSetTemperature(call) -> None:
+    async def stoveSetTemperature(call) -> None:
         """Set Stove Temperature."""
         hottoh.set_temperature(call.data["value"])
 
-    def stoveSetPowerLevel(call) -> None:
+    async def stoveSetPowerLevel(call) -> None:
         """Set Stove Power Level."""
         hottoh.set_power_level(call.data["value"])
 
-    def stoveSetSpeedFan1(call) -> None:
+    async def stoveSetSpeedFan1(call) -> None:
         """Set Stove Fan 1 Speed."""
         hottoh.set_speed_fan_1(call.data["value"])
 
-    def stoveSetSpeedFan2(call) -> None:
+    async def stoveSetSpeedFan2(call) -> None:
         """Set Stove Fan 2 Speed."""
         hottoh.set_speed_fan_2(call.data["value"])
 
-    def stoveSetSpeedFan3(call) -> None:
+    async def stoveSetSpeedFan3(call) -> None:
         """Set Stove Fan 3 Speed."""
         hottoh.set_speed_fan_3(call.data["value"])
 
-    def stoveSetEcoModeOn(call) -> None:
+    async def stoveSetEcoModeOn(call) -> None:
         """Set Stove Eco Mode On."""
         hottoh.set_eco_mode_on()
 
-    def stoveSetEcoModeOff(call) -> None:
+    async def stoveSetEcoModeOff(call) -> None:
         """Set Stove Eco Mode Off."""
         hottoh.set_eco_mode_off()
 
-    def stoveSetChronoModeOn(call) -> None:
+    async def stoveSetChronoModeOn(call) -> None:
         """Set Stove Chrono Mode On."""
         hottoh.set_chrono_mode_on()
 
-    def stoveSetChronoModeOff(call) -> None:
+    async def stoveSetChronoModeOff(call) -> None:
         """Set Stove Chrono Mode Off."""
         hottoh.set_chrono_mode_off()
 
-    def stoveSetOn(call) -> None:
+    async def stoveSetOn(call) -> None:
         """Set Stove On."""
         hottoh.set_on()
 
-    def stoveSetOff(call) -> None:
+    async def stoveSetOff(call) -> None:
         """Set Stove Off."""
         hottoh.set_off()
 
+    async def stoveStartCapture(call) -> None:
+        """Record the frames exchanged with the targeted Stove to a file."""
+        entry_id, session = async_service_session(hass, call)
+        filename = call.data.get("filename")
+        if filename is None:
+            filename = hass.config.path(
+                f"hottoh_{entry_id}_{dt_util.now():%Y%m%d_%H%M%S}.cap"
+            )
+        elif not hass.config.is_allowed_path(filename):
+            raise exceptions.HomeAssistantError(f"Cannot write to {filename}")
+        await async_stop_capture(hass, session)
+        capture = FrameCapture(filename)
+        await hass.async_add_executor_job(capture.open)
+        session.client.capture = capture
+        _LOGGER.info(
+            "Capturing the frames of %s to %s", session.client.address, filename
+        )
+
+    async def stoveStopCapture(call) -> None:
+        """Stop recording the frames exchanged with the targeted Stove."""
+        _, session = async_service_session(hass, call)
+        await async_stop_capture(hass, session)
+
     # Register our service with Home Assistant.
     hass.services.async_register(DOMAIN, "set_temperature", stoveSetTemperature)
     hass.services.async_register(DOMAIN, "set_power_level", stoveSetPowerLevel)
@@ -119,13 +200,16 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     hass.services.async_register(DOMAIN, "chrono_mode_turn_off", stoveSetChronoModeOff)
     hass.services.async_register(DOMAIN, "turn_on", stoveSetOn)
     hass.services.async_register(DOMAIN, "turn_off", stoveSetOff)
+    hass.services.async_register(DOMAIN, "start_capture", stoveStartCapture)
+    hass.services.async_register(DOMAIN, "stop_capture", stoveStopCapture)
 
-    if hottoh.getFanNumber() == 1:
+    fan_number = coordinator.capabilities.fan_number
+    if fan_number == 1:
         hass.services.async_register(DOMAIN, "set_speed_fan_1", stoveSetSpeedFan1)
-    if hottoh.getFanNumber() == 2:
+    if fan_number == 2:
         hass.services.async_register(DOMAIN, "set_speed_fan_1", stoveSetSpeedFan1)
         hass.services.async_register(DOMAIN, "set_speed_fan_2", stoveSetSpeedFan2)
-    if hottoh.getFanNumber() == 3:
+    if fan_number == 3:
         hass.services.async_register(DOMAIN, "set_speed_fan_1", stoveSetSpeedFan1)
         hass.services.async_register(DOMAIN, "set_speed_fan_2", stoveSetSpeedFan2)
         hass.services.async_register(DOMAIN, "set_speed_fan_3", stoveSetSpeedFan3)
@@ -135,35 +219,34 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    for component in PLATFORMS:
-        unload_ok = await hass.config_entries.async_forward_entry_unload(
-            config_entry, component
-        )
+    domain_data = hass.data[DOMAIN][config_entry.entry_id]
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        config_entry, domain_data[FORWARDED_PLATFORMS]
+    )
 
     if unload_ok:
-        domain_data = hass.data[DOMAIN][config_entry.entry_id]
         domain_data[CANCEL_STOP]()
+        await async_stop_capture(hass, domain_data[HOTTOH_SESSION])
         await async_disconnect_or_timeout(hass, hottoh=domain_data[HOTTOH_SESSION])
         hass.data[DOMAIN].pop(config_entry.entry_id)
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Remove the saved capabilities of a config entry."""
+    await capabilities_store(hass, config_entry.entry_id).async_remove()
+
+
 async def async_connect_or_timeout(hass, hottoh):
     """Connect to HottoH."""
     try:
-        name = None
-        with async_timeout.timeout(10):
+        async with asyncio.timeout(10):
             _LOGGER.debug("Initialize connection to Hottoh")
             if not hottoh.is_connected():
-                await hass.async_add_executor_job(hottoh.connect)
-            while not hottoh.is_connected() or name is None:
-                # Waiting for connection and check datas ready
-                name = hottoh.get_name()
-                if name:
-                    break
-                await asyncio.sleep(1)
-
+                hottoh.connect()
+            # Woken by the first complete frame, the name is then known
+            await hottoh.client.async_wait_first_frame()
             name = hottoh.get_name()
 
     except HottohConnectionError as err:
@@ -178,14 +261,95 @@ async def async_connect_or_timeout(hass, hottoh):
     return {HOTTOH_SESSION: hottoh, CONF_NAME: name}
 
 
+@callback
+def async_stove_platforms(capabilities) -> list[str]:
+    """Return the platforms with entities for a stove of these capabilities."""
+    return [
+        platform
+        for platform in PLATFORMS
+        if (capability := PLATFORM_CAPABILITIES.get(platform)) is None
+        or getattr(capabilities, capability)
+    ]
+
+
 async def async_disconnect_or_timeout(hass, hottoh):
-    """Disconnect to Hottoh."""
+    """Disconnect to Hottoh, waiting at most STOP_TIMEOUT for the socket."""
     _LOGGER.debug("Disconnect Hottoh")
-    with async_timeout.timeout(3):
-        await hass.async_add_executor_job(hottoh.disconnect)
+    await hottoh.client.async_stop()
     return True
 
 
+@callback
+def async_service_session(hass, call: ServiceCall):
+    """Return the entry id and session of the stove a service call targets.
+
+    The stove is named by the config_entry_id or device_id of the call, and
+    may be left out when a single stove is set up.
+    """
+    sessions = {
+        entry_id: domain_data[HOTTOH_SESSION]
+        for entry_id, domain_data in hass.data.get(DOMAIN, {}).items()
+        if entry_id != SESSION_CACHE
+    }
+    if ATTR_DEVICE_ID in call.data:
+        device = dr.async_get(hass).async_get(call.data[ATTR_DEVICE_ID])
+        entry_ids = [
+            entry_id
+            for entry_id in (device.config_entries if device is not None else ())
+            if entry_id in sessions
+        ]
+    elif ATTR_CONFIG_ENTRY_ID in call.data:
+        entry_ids = [call.data[ATTR_CONFIG_ENTRY_ID]]
+    else:
+        entry_ids = list(sessions)
+    if len(entry_ids) != 1 or entry_ids[0] not in sessions:
+        raise exceptions.HomeAssistantError(
+            f"Name the stove of {call.service} with config_entry_id or device_id"
+        )
+    return entry_ids[0], sessions[entry_ids[0]]
+
+
+async def async_stop_capture(hass, hottoh):
+    """Stop the capture of the frames of hottoh, if any."""
+    capture, hottoh.client.capture = hottoh.client.capture, None
+    if capture is not None:
+        await capture.async_close()
+        _LOGGER.info("Captured %s frames to %s", capture.frames, capture.path)
+
+
+@callback
+def async_cache_session(hass, hottoh):
+    """Keep a connected session for the config entry about to be set up.
+
+    The session is disconnected if no entry adopts it within
+    SESSION_CACHE_TIMEOUT seconds.
+    """
+    key = (hottoh.client.address, hottoh.client.port)
+    cache = hass.data.setdefault(DOMAIN, {}).setdefault(SESSION_CACHE, {})
+    previous = async_pop_session(hass, *key)
+    if previous is not None and previous is not hottoh:
+        previous.disconnect()
+
+    @callback
+    def _async_expire(_now):
+        if cache.get(key, (None,))[0] is hottoh:
+            del cache[key]
+            _LOGGER.debug("Disconnect unused session of %s:%s", *key)
+            hottoh.disconnect()
+
+    cache[key] = (hottoh, async_call_later(hass, SESSION_CACHE_TIMEOUT, _async_expire))
+
+
+@callback
+def async_pop_session(hass, host, port):
+    """Return the cached session of host and port, None if there is none."""
+    cache = hass.data.get(DOMAIN, {}).get(SESSION_CACHE, {})
+    hottoh, cancel_expire = cache.pop((host, port), (None, None))
+    if cancel_expire is not None:
+        cancel_expire()
+    return hottoh
+
+
 async def async_update_options(hass, config_entry):
     """Update options."""
     await hass.config_entries.async_reload(config_entry.entry_id)
@@ -195,29 +359,30 @@ class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
 
-class HottohEntity(Entity):
-    SCAN_INTERVAL = timedelta(seconds=10)
+class HottohEntity(CoordinatorEntity[HottohDataUpdateCoordinator]):
+    """Base entity reading its values from the stove coordinator."""
 
-    def __init__(self, hottoh):
-        """Initialize the Climate."""
-        Entity.__init__(self)
-        self.api = hottoh
+    def __init__(self, coordinator, fields=None):
+        """Initialize the entity.
 
-    @property
-    def should_poll(self):
-        return True
+        fields are the StoveState fields read by the entity, its state is only
+        written when one of them changes.
+        """
+        CoordinatorEntity.__init__(
+            self, coordinator, frozenset(fields) if fields is not None else None
+        )
+        self.api = coordinator.api
+        # Resolved once, the entry is reloaded when the stove changes identity
+        capabilities = coordinator.capabilities
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, capabilities.name)},
+            name=capabilities.name,
+            sw_version=capabilities.firmware,
+            model=capabilities.manufacturer,
+            manufacturer=capabilities.manufacturer,
+        )
 
     @property
     def available(self):
-        return self.api.is_connected()
-
-    @property
-    def device_info(self):
-        """Return information to link this entity with the correct device."""
-        return {
-            "identifiers": {(DOMAIN, self.api.get_name())},
-            "name": self.api.get_name(),
-            "sw_version": self.api.get_firmware(),
-            "model": self.api.get_manufacturer(),
-            "manufacturer": self.api.get_manufacturer(),
-        }
+        # The coordinator fails as soon as the connection drops
+        return self.coordinator.data is not None and super().available
@@ -0,0 +1,219 @@
+"""Capture and replay of the raw frames exchanged with a stove.
+
+A capture file starts with CAPTURE_MAGIC, followed by one record per frame,
+appended as they are sent or received::
+
+    timestamp   float64, seconds since the epoch
+    direction   uint8, FRAME_SENT or FRAME_RECEIVED
+    length      uint16, length of the frame
+    frame       the raw frame, from ``#`` to the CRC
+
+All numbers are little endian. Records are only ever appended, a capture
+cut short by a crash loses at most the records not written yet. Replays
+read the file through a memory map, so captures of several days are
+streamed rather than loaded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Iterator
+from dataclasses import dataclass
+import logging
+import mmap
+from pathlib import Path
+import struct
+import time
+from typing import TYPE_CHECKING, BinaryIO
+
+from .protocol import HottohProtocolError, parse_frame
+
+if TYPE_CHECKING:
+    from .client import HottohAsyncClient
+
+_LOGGER = logging.getLogger(__name__)
+
+CAPTURE_MAGIC = b"HOTTOHCAP\x01"
+FRAME_SENT = 0
+FRAME_RECEIVED = 1
+
+_RECORD = struct.Struct("<dBH")
+_BUFFER_SIZE = 64 * 1024
+
+
+class HottohCaptureError(Exception):
+    """Error to indicate a file which is not a capture."""
+
+
+@dataclass(frozen=True, slots=True)
+class CapturedFrame:
+    """A raw frame of a capture."""
+
+    timestamp: float
+    direction: int
+    raw: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class CapturedDial:
+    """The INF, DAT 0 and DAT 2 answers of one frame of the stove."""
+
+    timestamp: float
+    info: list[str]
+    data: list[str]
+    data2: list[str]
+
+
+class FrameCapture:
+    """Append the frames of a client to a capture file.
+
+    open and close do file I/O, run them in the executor or use async_close.
+    record is called from the event loop and only fills a buffer in memory,
+    written from the executor every _BUFFER_SIZE bytes and on close.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Create a closed capture."""
+        self.path = Path(path)
+        self.frames = 0
+        self._file: BinaryIO | None = None
+        self._pending = bytearray()
+        self._writing: asyncio.Future | None = None
+
+    def open(self) -> None:
+        """Open the file for appending, create it if missing."""
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(CAPTURE_MAGIC)
+
+    def record(
+        self, direction: int, raw: bytes, timestamp: float | None = None
+    ) -> None:
+        """Append a frame, stamped with the current time by default."""
+        if self._file is None:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        self._pending += _RECORD.pack(timestamp, direction, len(raw))
+        self._pending += raw
+        self.frames += 1
+        if len(self._pending) >= _BUFFER_SIZE and self._writing is None:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        """Write the buffer from the executor, one chunk at a time."""
+        chunk, self._pending = bytes(self._pending), bytearray()
+        self._writing = asyncio.get_running_loop().run_in_executor(
+            None, self._write, chunk
+        )
+        self._writing.add_done_callback(self._written)
+
+    def _written(self, future: asyncio.Future) -> None:
+        self._writing = None
+        if future.exception() is not None:
+            _LOGGER.error("Cannot write capture %s: %s", self.path, future.exception())
+        elif len(self._pending) >= _BUFFER_SIZE and self._file is not None:
+            self._write_pending()
+
+    def _write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._file.flush()
+
+    def close(self) -> None:
+        """Write the buffer, then close the file."""
+        if self._file is not None:
+            self._file.write(self._pending)
+            self._pending.clear()
+            self._file.close()
+            self._file = None
+
+    async def async_close(self) -> None:
+        """Close the file from the executor once the chunk in flight is written."""
+        while self._writing is not None:
+            await asyncio.wait([self._writing])
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+def read_capture(path: str | Path) -> Iterator[CapturedFrame]:
+    """Yield the frames of a capture file, in order."""
+    with open(path, "rb") as file:
+        if file.seek(0, 2) == 0:
+            raise HottohCaptureError(f"Empty capture {path}")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[: len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+                raise HottohCaptureError(f"Not a capture {path}")
+            offset, size = len(CAPTURE_MAGIC), len(view)
+            while offset + _RECORD.size <= size:
+                timestamp, direction, length = _RECORD.unpack_from(view, offset)
+                offset += _RECORD.size
+                if offset + length > size:
+                    _LOGGER.debug("Truncated last record in %s", path)
+                    return
+                yield CapturedFrame(
+                    timestamp, direction, view[offset : offset + length]
+                )
+                offset += length
+
+
+def iter_dials(frames: Iterable[CapturedFrame]) -> Iterator[CapturedDial]:
+    """Pair the requests and answers of frames into the dials of the client.
+
+    Writes are skipped, so are the dials with a corrupted answer.
+    """
+    request = None
+    answers: dict[str, list[str]] = {}
+    for frame in frames:
+        try:
+            decoded = parse_frame(frame.raw)
+        except HottohProtocolError:
+            request = None
+            answers.clear()
+            continue
+        if frame.direction == FRAME_SENT:
+            request = decoded
+            continue
+        if request is None or request.mode != "R":
+            continue
+        key = request.command
+        if key == "DAT":
+            key = f"DAT{request.parameters[0]}"
+        answers[key] = decoded.parameters
+        request = None
+        if key == "DAT2" and answers.keys() >= {"INF", "DAT0"}:
+            yield CapturedDial(
+                frame.timestamp, answers["INF"], answers["DAT0"], answers["DAT2"]
+            )
+            answers = {}
+
+
+async def async_replay(
+    path: str | Path, speed: float | None = 1.0
+) -> AsyncIterator[CapturedDial]:
+    """Yield the dials of a capture at speed times their recorded pace.
+
+    speed None yields them as fast as they are read.
+    """
+    loop = asyncio.get_running_loop()
+    start = first = None
+    for dial in iter_dials(read_capture(path)):
+        if speed is not None:
+            if first is None:
+                start, first = loop.time(), dial.timestamp
+            delay = start + (dial.timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield dial
+
+
+async def async_replay_client(
+    client: HottohAsyncClient, path: str | Path, speed: float | None = 1.0
+) -> int:
+    """Feed the dials of a capture to client, as if read from the stove.
+
+    Return the number of dials replayed.
+    """
+    dials = 0
+    async for dial in async_replay(path, speed):
+        client.handle_frame(dial.info, dial.data, dial.data2)
+        dials += 1
+    return dials
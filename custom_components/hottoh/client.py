@@ -0,0 +1,527 @@
+"""Asyncio client for the HottoH TCP protocol."""
+
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Callable
+import logging
+import random
+import time
+
+from hottohpy import Hottoh, StoveCommands
+
+from .capture import FRAME_RECEIVED, FRAME_SENT, FrameCapture
+from .protocol import (
+    FRAME_START,
+    HEADER_LENGTH,
+    CRC_LENGTH,
+    Frame,
+    HottohCrcError,
+    HottohProtocolError,
+    decode_frame,
+    decode_header,
+    encode_frame,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAME_INTERVAL = 1.0
+# Reconnection attempts back off exponentially from RECONNECT_DELAY up to
+# RECONNECT_MAX_DELAY, each delay randomized in its upper half
+RECONNECT_DELAY = 5.0
+RECONNECT_MAX_DELAY = 300.0
+REQUEST_TIMEOUT = 10.0
+COMMAND_DEBOUNCE = 0.5
+TRANSACTION_TIMEOUT = 30.0
+# Longest wait for the socket to close when stopping, shutdown and reloads
+# never wait for longer
+STOP_TIMEOUT = 1.0
+
+# Upper bounds, in seconds, of the buckets of the request latency histogram
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Registers driven by sliders in the UI, their writes are held for
+# COMMAND_DEBOUNCE so only the last value of a drag reaches the stove
+DEBOUNCED_REGISTERS = {
+    str(command.value)
+    for command in (
+        StoveCommands.PARAM_NIVEAU_PUISSANCE,
+        StoveCommands.PARAM_AMBIANCE_TEMPERATURE_1,
+        StoveCommands.INCONNU_4,
+        StoveCommands.PARAM_NIVEAU_FAN_1,
+        StoveCommands.PARAM_NIVEAU_FAN_2,
+        StoveCommands.PARAM_NIVEAU_FAN_3,
+        StoveCommands.PARAM_CHRONO_TEMPERATURE_1,
+        StoveCommands.PARAM_CHRONO_TEMPERATURE_2,
+        StoveCommands.PARAM_CHRONO_TEMPERATURE_3,
+    )
+}
+
+
+class HottohCommandError(Exception):
+    """Error to indicate writes could not be sent to the stove."""
+
+
+class CommandQueue:
+    """Register writes waiting to be sent, in order.
+
+    A write to a register that is still pending replaces the queued one and
+    moves to the end of the queue, so the stove only sees the last value.
+
+    Writes are sent in order once due. A debounced write does not hold back
+    the writes queued after it: turning the stove off while the setpoint is
+    being dragged is sent right away, the setpoint when the drag settles.
+    Registers are independent, so the stove ends up in the same state.
+    """
+
+    def __init__(self, debounce=COMMAND_DEBOUNCE) -> None:
+        """Create an empty queue."""
+        self.debounce = debounce
+        self._pending: dict[str, tuple[list[str], float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, parameters: list[str], now: float) -> bool:
+        """Queue the write of parameters, ``[register, value]``.
+
+        Return True if it replaced a pending write to the same register.
+        """
+        register = parameters[0]
+        coalesced = self._pending.pop(register, None) is not None
+        due = now + self.debounce if register in DEBOUNCED_REGISTERS else now
+        self._pending[register] = (parameters, due)
+        return coalesced
+
+    def next_due(self) -> float | None:
+        """Return when the first write will be due, None if the queue is empty."""
+        if not self._pending:
+            return None
+        return min(due for _, due in self._pending.values())
+
+    def pop_due(self, now: float) -> list[list[str]]:
+        """Remove and return, in order, the writes due at now."""
+        due = [
+            register for register, (_, due_at) in self._pending.items() if due_at <= now
+        ]
+        return [self._pending.pop(register)[0] for register in due]
+
+    def discard(self, registers) -> None:
+        """Drop the pending writes of registers."""
+        for register in registers:
+            self._pending.pop(register, None)
+
+    def requeue(self, writes: list[list[str]]) -> None:
+        """Put back at the front writes that could not be sent.
+
+        A register written again in the meantime keeps its newer value.
+        """
+        pending = {
+            parameters[0]: (parameters, 0.0)
+            for parameters in writes
+            if parameters[0] not in self._pending
+        }
+        pending.update(self._pending)
+        self._pending = pending
+
+    def values(self) -> list[list[str]]:
+        """Return the pending writes, in order."""
+        return [parameters for parameters, _ in self._pending.values()]
+
+
+class ClientStats:
+    """Health counters of a client, of constant size whatever its uptime."""
+
+    def __init__(self) -> None:
+        """Create zeroed counters."""
+        self.requests = 0
+        self.latency_total = 0.0
+        # The last bucket counts the requests slower than LATENCY_BUCKETS
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.frames = 0
+        self.connections = 0
+        self.crc_errors = 0
+        self.protocol_errors = 0
+        self.timeouts = 0
+        self.connection_errors = 0
+        self.coalesced_writes = 0
+        self.last_frame: float | None = None
+        self.last_frame_time: float | None = None
+        self._minute_start = time.monotonic()
+        self._minute_frames = 0
+        self._previous_minute_frames = 0
+
+    def record_request(self, latency: float) -> None:
+        """Count a request answered in latency seconds."""
+        self.requests += 1
+        self.latency_total += latency
+        self.latency_histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def record_frame(self, now: float) -> None:
+        """Count a complete frame received at now."""
+        self.frames += 1
+        self.last_frame = now
+        self.last_frame_time = time.time()
+        self._roll_minute(now)
+        self._minute_frames += 1
+
+    def record_error(self, err: BaseException) -> None:
+        """Count a communication error by cause."""
+        if isinstance(err, HottohCrcError):
+            self.crc_errors += 1
+        elif isinstance(err, HottohProtocolError):
+            self.protocol_errors += 1
+        elif isinstance(err, asyncio.TimeoutError):
+            self.timeouts += 1
+        else:
+            self.connection_errors += 1
+
+    @property
+    def reconnects(self) -> int:
+        return max(self.connections - 1, 0)
+
+    @property
+    def mean_latency(self) -> float | None:
+        if not self.requests:
+            return None
+        return self.latency_total / self.requests
+
+    def frames_per_minute(self, now: float) -> int:
+        """Return the number of frames received during the last full minute."""
+        self._roll_minute(now)
+        return self._previous_minute_frames
+
+    def seconds_since_last_frame(self, now: float) -> float | None:
+        if self.last_frame is None:
+            return None
+        return now - self.last_frame
+
+    def as_dict(self, now: float) -> dict:
+        """Return the counters, for diagnostics."""
+        return {
+            "requests": self.requests,
+            "mean_latency": self.mean_latency,
+            "latency_histogram": dict(
+                zip([*map(str, LATENCY_BUCKETS), "inf"], self.latency_histogram)
+            ),
+            "frames": self.frames,
+            "frames_per_minute": self.frames_per_minute(now),
+            "seconds_since_last_frame": self.seconds_since_last_frame(now),
+            "connections": self.connections,
+            "reconnects": self.reconnects,
+            "crc_errors": self.crc_errors,
+            "protocol_errors": self.protocol_errors,
+            "timeouts": self.timeouts,
+            "connection_errors": self.connection_errors,
+            "coalesced_writes": self.coalesced_writes,
+        }
+
+    def _roll_minute(self, now: float) -> None:
+        elapsed = now - self._minute_start
+        if elapsed < 60:
+            return
+        # A minute without any frame at all reads as zero
+        self._previous_minute_frames = self._minute_frames if elapsed < 120 else 0
+        self._minute_frames = 0
+        self._minute_start = now
+
+
+class HottohAsyncClient:
+    """Talk to the stove wifi module from the event loop.
+
+    Drop-in replacement of the threaded ``HottohRemoteClient`` of hottohpy:
+    ``Hottoh`` reads ``_info``, ``_data`` and ``_data2`` and queues its writes
+    through ``sendCommand``, so all its getters and setters keep working.
+    """
+
+    def __init__(self, address, port, id=0, frame_interval=FRAME_INTERVAL) -> None:
+        """Create the client."""
+        self.address = address
+        self.port = port
+        self.id = id
+        self.frame_interval = frame_interval
+        self._info = None
+        self._data = None
+        self._data2 = None
+        self._commands = CommandQueue()
+        self.stats = ClientStats()
+        self.capture: FrameCapture | None = None
+        self._transactions: deque[tuple[list[list[str]], asyncio.Future]] = deque()
+        self._recording: list[list[str]] | None = None
+        self._frame_listeners: list[Callable[[], None]] = []
+        self._connection_listeners: list[Callable[[bool], None]] = []
+        self._failures = 0
+        self._connected = False
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._first_frame: asyncio.Event | None = None
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    def is_connected(self):
+        return self._connected
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of writes and transactions waiting to be sent."""
+        return len(self._commands) + len(self._transactions)
+
+    def sendCommand(self, parameters):
+        """Queue a register write, safe to call from any thread."""
+        if self._recording is not None:
+            self._recording.append(parameters)
+            return True
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop or self._loop is None:
+            self._put_command(parameters)
+        else:
+            self._loop.call_soon_threadsafe(self._put_command, parameters)
+        return True
+
+    def _put_command(self, parameters):
+        if self._commands.put(parameters, time.monotonic()):
+            self.stats.coalesced_writes += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def async_run_transaction(self, *calls: Callable[[], object]) -> None:
+        """Send the writes made by calls back to back, in one exclusive slot.
+
+        calls are setters of the Hottoh session, for instance
+        ``hottoh.set_eco_mode_on``. Their writes supersede any pending write
+        to the same registers and are sent before the queued commands, without
+        a frame in between. Raise HottohCommandError if the group failed.
+        """
+        writes: list[list[str]] = []
+        self._recording = writes
+        try:
+            for call in calls:
+                call()
+        finally:
+            self._recording = None
+
+        self._commands.discard(parameters[0] for parameters in writes)
+        transaction = (writes, self._loop.create_future())
+        self._transactions.append(transaction)
+        self._wakeup.set()
+        try:
+            async with asyncio.timeout(TRANSACTION_TIMEOUT):
+                await transaction[1]
+        except asyncio.TimeoutError as err:
+            if transaction in self._transactions:
+                self._transactions.remove(transaction)
+            raise HottohCommandError("Stove did not answer in time") from err
+
+    async def async_wait_first_frame(self) -> None:
+        """Wait until the stove has sent a complete frame."""
+        await self._first_frame.wait()
+
+    def add_frame_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call listener from the event loop after every complete frame."""
+        self._frame_listeners.append(listener)
+        return lambda: self._frame_listeners.remove(listener)
+
+    def add_connection_listener(
+        self, listener: Callable[[bool], None]
+    ) -> Callable[[], None]:
+        """Call listener with False when the connection is lost."""
+        self._connection_listeners.append(listener)
+        return lambda: self._connection_listeners.remove(listener)
+
+    def reconnect_delay(self) -> float:
+        """Return how long to wait before the next connection attempt."""
+        delay = min(
+            RECONNECT_MAX_DELAY, RECONNECT_DELAY * 2 ** min(self._failures - 1, 16)
+        )
+        # Jitter keeps stoves sharing an access point from retrying in lockstep
+        return random.uniform(delay / 2, delay)
+
+    def start(self):
+        """Start the connection loop, must be called from the event loop."""
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._first_frame = asyncio.Event()
+            self._task = self._loop.create_task(
+                self._async_run(), name=f"hottoh-client-{self.address}"
+            )
+
+    def stop(self):
+        """Stop the connection loop and close the socket."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._close()
+        while self._transactions:
+            _, future = self._transactions.popleft()
+            if not future.done():
+                future.set_exception(HottohCommandError("Connection closed"))
+
+    async def async_stop(self, timeout=STOP_TIMEOUT):
+        """Stop, then wait at most timeout for the loop and the socket to end."""
+        task, writer = self._task, self._writer
+        self.stop()
+        pending = []
+        if task is not None:
+            pending.append(task)
+        if writer is not None:
+            pending.append(writer.wait_closed())
+        if not pending:
+            return
+        try:
+            async with asyncio.timeout(timeout):
+                await asyncio.gather(*pending, return_exceptions=True)
+        except asyncio.TimeoutError:
+            _LOGGER.debug("Stove %s did not close in time", self.address)
+
+    async def _async_run(self):
+        """Keep a session with the stove, reconnecting until stopped."""
+        while True:
+            try:
+                await self._async_connect()
+                while True:
+                    # Commands go first so the frame that follows reads back
+                    # their effect
+                    await self._async_send_commands()
+                    await self._async_dial()
+                    if self._failures:
+                        _LOGGER.info("Stove %s is back", self.address)
+                        self._failures = 0
+                    await self._async_wait(self.frame_interval)
+            except (
+                OSError,
+                asyncio.TimeoutError,
+                asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                HottohProtocolError,
+            ) as err:
+                self._async_handle_error(err)
+            except Exception as err:  # pylint: disable=broad-except
+                # Never leave the stove without a session
+                _LOGGER.exception("Unexpected error with stove %s", self.address)
+                self._async_handle_error(err)
+            await asyncio.sleep(self.reconnect_delay())
+
+    def _async_handle_error(self, err: Exception) -> None:
+        self.stats.record_error(err)
+        self._failures += 1
+        if self._failures == 1:
+            _LOGGER.error("Stove %s communication error: %s", self.address, err)
+        else:
+            _LOGGER.debug("Stove %s communication error: %s", self.address, err)
+        was_connected = self._connected
+        self._close()
+        if was_connected:
+            for listener in list(self._connection_listeners):
+                listener(False)
+
+    async def _async_connect(self):
+        _LOGGER.debug("Try to connect the Stove %s:%s", self.address, self.port)
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            self._reader, self._writer = await asyncio.open_connection(
+                self.address, self.port
+            )
+        self._connected = True
+        self.stats.connections += 1
+
+    async def _async_dial(self):
+        info = await self._async_request("INF", "R", [""])
+        data = await self._async_request("DAT", "R", ["0"])
+        data2 = await self._async_request("DAT", "R", ["2"])
+        self.handle_frame(info, data, data2)
+
+    def handle_frame(self, info, data, data2):
+        """Take a complete frame of the stove, read or replayed."""
+        self._info, self._data, self._data2 = info, data, data2
+        self.stats.record_frame(time.monotonic())
+        if self._first_frame is not None:
+            self._first_frame.set()
+        for listener in list(self._frame_listeners):
+            listener()
+
+    async def _async_send_commands(self):
+        while self._transactions:
+            writes, future = self._transactions.popleft()
+            if future.done():
+                # Caller gave up waiting
+                continue
+            try:
+                for parameters in writes:
+                    _LOGGER.debug("Send Command %s", parameters)
+                    await self._async_request("DAT", "W", parameters)
+            except Exception as err:
+                if not future.done():
+                    future.set_exception(HottohCommandError(str(err)))
+                raise
+            if not future.done():
+                future.set_result(None)
+
+        writes = self._commands.pop_due(time.monotonic())
+        for index, parameters in enumerate(writes):
+            _LOGGER.debug("Send Command %s", parameters)
+            try:
+                await self._async_request("DAT", "W", parameters)
+            except BaseException:
+                # Sent again once the connection is back
+                self._commands.requeue(writes[index:])
+                raise
+
+    async def _async_wait(self, delay):
+        """Sleep until the next frame, or until a queued command is due."""
+        deadline = time.monotonic() + delay
+        while not self._transactions:
+            self._wakeup.clear()
+            due = self._commands.next_due()
+            wake_at = deadline if due is None else min(deadline, due)
+            timeout = wake_at - time.monotonic()
+            if timeout <= 0:
+                return
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._wakeup.wait()
+            except asyncio.TimeoutError:
+                pass
+
+    async def _async_request(self, command, mode, parameters) -> list[str]:
+        start = time.monotonic()
+        raw = encode_frame(command, mode, parameters, self.id)
+        self._writer.write(raw)
+        if self.capture is not None:
+            self.capture.record(FRAME_SENT, raw)
+        async with asyncio.timeout(REQUEST_TIMEOUT):
+            await self._writer.drain()
+            frame = await self._async_read_frame()
+        self.stats.record_request(time.monotonic() - start)
+        return frame.parameters
+
+    async def _async_read_frame(self) -> Frame:
+        # Anything before the start of frame, like the trailing line feed of
+        # the previous one, is discarded
+        await self._reader.readuntil(FRAME_START)
+        header = await self._reader.readexactly(HEADER_LENGTH)
+        _, _, _, length = decode_header(header)
+        payload = await self._reader.readexactly(length + CRC_LENGTH)
+        if self.capture is not None:
+            # Before decoding, so corrupted frames are captured too
+            self.capture.record(FRAME_RECEIVED, FRAME_START + header + payload)
+        return decode_frame(header, payload)
+
+    def _close(self):
+        self._connected = False
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+
+def create_hottoh(address, port) -> Hottoh:
+    """Return a Hottoh session using the asyncio client."""
+    hottoh = Hottoh(address=address, port=port)
+    hottoh.client = HottohAsyncClient(address, port)
+    return hottoh
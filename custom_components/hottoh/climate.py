@@ -1,5 +1,6 @@
 """Support for Hottoh Climate Entity."""
 
+from functools import partial
 import logging
 
 from homeassistant.helpers.restore_state import RestoreEntity
@@ -13,6 +14,7 @@ from homeassistant.components.climate.const import (
     PRESET_COMFORT,
     ATTR_PRESET_MODE,
 )
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.const import (
     ATTR_TEMPERATURE,
     PRECISION_HALVES,
@@ -22,12 +24,13 @@ from homeassistant.const import (
 
 from .const import (
     DOMAIN,
-    HOTTOH_SESSION,
+    COORDINATOR,
     CONF_AWAY_TEMP,
     CONF_COMFORT_TEMP,
     CONF_ECO_TEMP,
 )
 from . import HottohEntity
+from .client import HottohCommandError
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -40,11 +43,11 @@ async def async_setup_entry(
     eco_temp = config_entry.data[CONF_ECO_TEMP]
     comfort_temp = config_entry.data[CONF_COMFORT_TEMP]
     domain_data = hass.data[DOMAIN][config_entry.entry_id]
-    hottoh = domain_data[HOTTOH_SESSION]
+    coordinator = domain_data[COORDINATOR]
 
-    climate = HottohDevice(hottoh, away_temp, eco_temp, comfort_temp)
+    climate = HottohDevice(coordinator, away_temp, eco_temp, comfort_temp)
 
-    async_add_entities([climate], True)
+    async_add_entities([climate])
 
 
 class HottohDevice(HottohEntity, ClimateEntity, RestoreEntity):
@@ -67,15 +70,26 @@ class HottohDevice(HottohEntity, ClimateEntity, RestoreEntity):
 
     """Representation of a Stove Climate"""
 
-    def __init__(self, hottoh, away_temp, eco_temp, comfort_temp):
+    def __init__(self, coordinator, away_temp, eco_temp, comfort_temp):
         """Initialize the Climate."""
-        HottohEntity.__init__(self, hottoh)
+        HottohEntity.__init__(
+            self,
+            coordinator,
+            (
+                "temperature_room_1",
+                "set_temperature_room_1",
+                "mode",
+                "action",
+                "set_speed_fan_1",
+            ),
+        )
         ClimateEntity.__init__(self)
         RestoreEntity.__init__(self)
-        self.api = hottoh
         self._away_temp = away_temp
         self._eco_temp = eco_temp
         self._comfort_temp = comfort_temp
+        self._attr_name = coordinator.capabilities.name
+        self._attr_unique_id = DOMAIN + self._attr_name
 
     async def async_added_to_hass(self):
         """Run when entity about to be added."""
@@ -87,33 +101,23 @@ class HottohDevice(HottohEntity, ClimateEntity, RestoreEntity):
             if old_state.attributes.get(ATTR_PRESET_MODE) is not None:
                 self._attr_preset_mode = old_state.attributes.get(ATTR_PRESET_MODE)
 
-    @property
-    def unique_id(self):
-        """Return Unique ID string."""
-        return DOMAIN + self.name
-
-    @property
-    def name(self) -> str:
-        """Return the name of the device, if any."""
-        return self.api.get_name()
-
     @property
     def current_temperature(self):
-        return self.api.get_temperature_room_1()
+        return self.coordinator.data.temperature_room_1
 
     @property
     def target_temperature(self):
-        return self.api.get_set_temperature_room_1()
+        return self.coordinator.data.set_temperature_room_1
 
     @property
     def hvac_mode(self):
-        if self.api.get_mode() == "on":
+        if self.coordinator.data is not None and self.coordinator.data.mode == "on":
             return HVACMode.HEAT
         return HVACMode.OFF
 
     @property
     def hvac_action(self):
-        return self.api.get_action()
+        return self.coordinator.data.action
 
     @property
     def icon(self) -> str:
@@ -158,27 +162,45 @@ class HottohDevice(HottohEntity, ClimateEntity, RestoreEntity):
         temperature = kwargs.get(ATTR_TEMPERATURE)
         if temperature is None:
             return
-        await self.hass.async_add_executor_job(self.api.set_temperature, temperature)
+        self.api.set_temperature(temperature)
+        self.coordinator.async_set_optimistic(set_temperature_room_1=float(temperature))
 
     async def async_set_preset_mode(self, preset_mode):
         """Set new target preset mode."""
         if preset_mode not in self.preset_modes:
             return None
+        calls = []
+        eco_mode = None
         if preset_mode == PRESET_ECO:
-            await self.hass.async_add_executor_job(
-                self.api.set_temperature, self._eco_temp
-            )
-            await self.hass.async_add_executor_job(self.api.set_eco_mode_on)
+            eco_mode = True
+            calls = [
+                partial(self.api.set_temperature, self._eco_temp),
+                self.api.set_eco_mode_on,
+            ]
         if preset_mode == PRESET_COMFORT:
-            await self.hass.async_add_executor_job(
-                self.api.set_temperature, self._comfort_temp
-            )
-            await self.hass.async_add_executor_job(self.api.set_eco_mode_off)
+            eco_mode = False
+            calls = [
+                partial(self.api.set_temperature, self._comfort_temp),
+                self.api.set_eco_mode_off,
+            ]
         if preset_mode == PRESET_AWAY:
-            await self.hass.async_add_executor_job(
-                self.api.set_temperature, self._away_temp
+            eco_mode = True
+            calls = [
+                partial(self.api.set_temperature, self._away_temp),
+                self.api.set_eco_mode_on,
+            ]
+
+        if calls:
+            try:
+                await self.api.client.async_run_transaction(*calls)
+            except HottohCommandError as err:
+                raise HomeAssistantError(
+                    f"Failed to set preset mode {preset_mode}: {err}"
+                ) from err
+            self.coordinator.async_set_optimistic(
+                set_temperature_room_1=float(self.presets[preset_mode]),
+                eco_mode=eco_mode,
             )
-            await self.hass.async_add_executor_job(self.api.set_eco_mode_on)
 
         self._attr_preset_mode = preset_mode
         self.async_write_ha_state()
@@ -186,14 +208,16 @@ class HottohDevice(HottohEntity, ClimateEntity, RestoreEntity):
     async def async_set_hvac_mode(self, hvac_mode):
         """Set new target hvac mode."""
         if hvac_mode == HVACMode.HEAT:
-            await self.hass.async_add_executor_job(self.api.set_on)
+            self.api.set_on()
+            self.coordinator.async_set_optimistic(is_on=True, mode="on")
 
         if hvac_mode == HVACMode.OFF:
-            await self.hass.async_add_executor_job(self.api.set_off)
+            self.api.set_off()
+            self.coordinator.async_set_optimistic(is_on=False, mode="off")
 
     @property
     def fan_mode(self):
-        return str(self.api.get_set_speed_fan_1())
+        return str(self.coordinator.data.set_speed_fan_1)
 
     @property
     def fan_modes(self):
@@ -201,4 +225,5 @@ class HottohDevice(HottohEntity, ClimateEntity, RestoreEntity):
 
     async def async_set_fan_mode(self, fan_mode):
         """Set new target fan mode."""
-        await self.hass.async_add_executor_job(self.api.set_speed_fan_1, fan_mode)
+        self.api.set_speed_fan_1(fan_mode)
+        self.coordinator.async_set_optimistic(set_speed_fan_1=int(fan_mode))
@@ -1,6 +1,8 @@
 """Config flow for HottoH CMG integration."""
+
 from __future__ import annotations
 
+from ipaddress import ip_network
 import logging
 from typing import Any
 
@@ -8,26 +10,61 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_NAME
-from homeassistant.components.dhcp import IP_ADDRESS, MAC_ADDRESS
+from homeassistant.components.network import async_get_source_ip
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.device_registry import format_mac
+from homeassistant.helpers.service_info.dhcp import DhcpServiceInfo
 
-from .const import DOMAIN, HOTTOH_DEFAULT_HOST, HOTTOH_DEFAULT_PORT, HOTTOH_SESSION, CONF_AWAY_TEMP, CONF_COMFORT_TEMP, CONF_ECO_TEMP
-from hottohpy import Hottoh
-from . import CannotConnect, async_connect_or_timeout, async_disconnect_or_timeout
+from .const import (
+    DOMAIN,
+    HOTTOH_DEFAULT_HOST,
+    HOTTOH_DEFAULT_PORT,
+    HOTTOH_SESSION,
+    CONF_AWAY_TEMP,
+    CONF_COMFORT_TEMP,
+    CONF_ECO_TEMP,
+    CONF_PUSH_UPDATES,
+    CONF_CONFIRM_TIMEOUT,
+    DEFAULT_CONFIRM_TIMEOUT,
+    CONF_MIN_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+    DEFAULT_MAX_INTERVAL,
+    CONF_TEMPERATURE_DEADBAND,
+    DEFAULT_TEMPERATURE_DEADBAND,
+    CONF_SMOKE_DEADBAND,
+    DEFAULT_SMOKE_DEADBAND,
+    CONF_SPEED_DEADBAND,
+    DEFAULT_SPEED_DEADBAND,
+    CONF_MAX_AGE,
+    DEFAULT_MAX_AGE,
+)
+from .client import create_hottoh
+from .discovery import async_scan
+from . import CannotConnect, async_cache_session, async_connect_or_timeout
 
 _LOGGER = logging.getLogger(__name__)
 
-STEP_USER_DATA_SCHEMA = vol.Schema(
-    {
-        vol.Required(CONF_HOST, default=HOTTOH_DEFAULT_HOST): str,
-        vol.Required(CONF_PORT, default=HOTTOH_DEFAULT_PORT): int,
-        vol.Required(CONF_AWAY_TEMP, default=15.00): vol.Coerce(float),
-        vol.Required(CONF_COMFORT_TEMP, default=20.00): vol.Coerce(float),
-        vol.Required(CONF_ECO_TEMP, default=18.00): vol.Coerce(float),
-    }
-)
+CONF_NETWORK = "network"
+
+
+def step_user_data_schema(host=HOTTOH_DEFAULT_HOST) -> vol.Schema:
+    """Return the schema of the manual step, with host as default."""
+    return vol.Schema(
+        {
+            vol.Required(CONF_HOST, default=host): str,
+            vol.Required(CONF_PORT, default=HOTTOH_DEFAULT_PORT): int,
+            vol.Required(CONF_AWAY_TEMP, default=15.00): vol.Coerce(float),
+            vol.Required(CONF_COMFORT_TEMP, default=20.00): vol.Coerce(float),
+            vol.Required(CONF_ECO_TEMP, default=18.00): vol.Coerce(float),
+        }
+    )
+
+
+STEP_USER_DATA_SCHEMA = step_user_data_schema()
+
 
 def hottoh_config_shema(options: dict = {}) -> dict:
     """Return a schema for Hottoh configuration options."""
@@ -37,30 +74,71 @@ def hottoh_config_shema(options: dict = {}) -> dict:
             CONF_PORT: HOTTOH_DEFAULT_PORT,
             CONF_AWAY_TEMP: 15.00,
             CONF_COMFORT_TEMP: 20.00,
-            CONF_ECO_TEMP: 18.00
+            CONF_ECO_TEMP: 18.00,
         }
-    
+
     return {
-        vol.Required(CONF_HOST, default=options.get(CONF_HOST, HOTTOH_DEFAULT_HOST)): str,
-        vol.Required(CONF_PORT, default=options.get(CONF_PORT, HOTTOH_DEFAULT_PORT)): int,
-        vol.Optional(CONF_AWAY_TEMP, default=options.get(CONF_AWAY_TEMP)): vol.Coerce(float),
-        vol.Optional(CONF_COMFORT_TEMP, default=options.get(CONF_COMFORT_TEMP)): vol.Coerce(float),
-        vol.Optional(CONF_ECO_TEMP, default=options.get(CONF_ECO_TEMP)): vol.Coerce(float),
+        vol.Required(
+            CONF_HOST, default=options.get(CONF_HOST, HOTTOH_DEFAULT_HOST)
+        ): str,
+        vol.Required(
+            CONF_PORT, default=options.get(CONF_PORT, HOTTOH_DEFAULT_PORT)
+        ): int,
+        vol.Optional(CONF_AWAY_TEMP, default=options.get(CONF_AWAY_TEMP)): vol.Coerce(
+            float
+        ),
+        vol.Optional(
+            CONF_COMFORT_TEMP, default=options.get(CONF_COMFORT_TEMP)
+        ): vol.Coerce(float),
+        vol.Optional(CONF_ECO_TEMP, default=options.get(CONF_ECO_TEMP)): vol.Coerce(
+            float
+        ),
+        vol.Optional(
+            CONF_PUSH_UPDATES, default=options.get(CONF_PUSH_UPDATES, True)
+        ): bool,
+        vol.Optional(
+            CONF_CONFIRM_TIMEOUT,
+            default=options.get(CONF_CONFIRM_TIMEOUT, DEFAULT_CONFIRM_TIMEOUT),
+        ): vol.All(vol.Coerce(int), vol.Range(min=1, max=120)),
+        vol.Optional(
+            CONF_MIN_INTERVAL,
+            default=options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0.5, max=60)),
+        vol.Optional(
+            CONF_MAX_INTERVAL,
+            default=options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL),
+        ): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+        vol.Optional(
+            CONF_TEMPERATURE_DEADBAND,
+            default=options.get(
+                CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND
+            ),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+        vol.Optional(
+            CONF_SMOKE_DEADBAND,
+            default=options.get(CONF_SMOKE_DEADBAND, DEFAULT_SMOKE_DEADBAND),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=50)),
+        vol.Optional(
+            CONF_SPEED_DEADBAND,
+            default=options.get(CONF_SPEED_DEADBAND, DEFAULT_SPEED_DEADBAND),
+        ): vol.All(vol.Coerce(float), vol.Range(min=0, max=50)),
+        vol.Optional(
+            CONF_MAX_AGE, default=options.get(CONF_MAX_AGE, DEFAULT_MAX_AGE)
+        ): vol.All(vol.Coerce(int), vol.Range(min=10, max=86400)),
     }
 
+
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
     """
-    hottoh = Hottoh(
-        address=data[CONF_HOST],
-        port=data[CONF_PORT]
-    )
+    hottoh = create_hottoh(address=data[CONF_HOST], port=data[CONF_PORT])
 
     info = await async_connect_or_timeout(hass, hottoh)
-    
-    # await async_disconnect_or_timeout(hass, hottoh)
+
+    # Handed over to async_setup_entry instead of connecting again
+    async_cache_session(hass, hottoh)
 
     return {
         HOTTOH_SESSION: hottoh,
@@ -68,7 +146,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
         CONF_HOST: data[CONF_HOST],
         CONF_AWAY_TEMP: data[CONF_AWAY_TEMP],
         CONF_COMFORT_TEMP: data[CONF_COMFORT_TEMP],
-        CONF_ECO_TEMP: data[CONF_ECO_TEMP]
+        CONF_ECO_TEMP: data[CONF_ECO_TEMP],
     }
 
 
@@ -77,11 +155,73 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
-    async def async_step_user(self, user_input) -> FlowResult:
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        self._host = HOTTOH_DEFAULT_HOST
+        self._found_hosts: list[str] = []
+
+    async def async_step_user(self, user_input=None) -> FlowResult:
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["manual", "scan"])
+
+    async def async_step_dhcp(self, discovery_info: DhcpServiceInfo) -> FlowResult:
+        """Handle a wifi module found by DHCP."""
+        await self.async_set_unique_id(format_mac(discovery_info.macaddress))
+        self._abort_if_unique_id_configured(updates={CONF_HOST: discovery_info.ip})
+        self._async_abort_entries_match({CONF_HOST: discovery_info.ip})
+        self._host = discovery_info.ip
+        self.context["title_placeholders"] = {CONF_HOST: discovery_info.ip}
+        return await self.async_step_manual()
+
+    async def async_step_scan(self, user_input=None) -> FlowResult:
+        """Probe a network for the port of the wifi module."""
+        errors = {}
+        if user_input is not None:
+            try:
+                network = ip_network(user_input[CONF_NETWORK], strict=False)
+            except ValueError:
+                errors["base"] = "invalid_network"
+            else:
+                if network.version != 4 or network.prefixlen < 22:
+                    errors["base"] = "invalid_network"
+                else:
+                    self._found_hosts = await async_scan(network)
+                    if self._found_hosts:
+                        return await self.async_step_pick()
+                    errors["base"] = "no_devices_found"
+
+        try:
+            source_ip = await async_get_source_ip(self.hass)
+        except HomeAssistantError:
+            source_ip = HOTTOH_DEFAULT_HOST
+        default = str(ip_network(f"{source_ip}/24", strict=False))
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=vol.Schema({vol.Required(CONF_NETWORK, default=default): str}),
+            errors=errors,
+        )
+
+    async def async_step_pick(self, user_input=None) -> FlowResult:
+        """Pick one of the hosts found by the scan."""
+        if user_input is not None:
+            self._host = user_input[CONF_HOST]
+            return await self.async_step_manual()
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST, default=self._found_hosts[0]): vol.In(
+                        self._found_hosts
+                    )
+                }
+            ),
+        )
+
+    async def async_step_manual(self, user_input=None) -> FlowResult:
+        """Handle the configuration of a stove."""
         if user_input is None:
             return self.async_show_form(
-                step_id="user", data_schema=STEP_USER_DATA_SCHEMA
+                step_id="manual", data_schema=step_user_data_schema(self._host)
             )
         errors = {}
 
@@ -98,7 +238,9 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             return self.async_create_entry(title=info[CONF_NAME], data=user_input)
 
         return self.async_show_form(
-            step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
+            step_id="manual",
+            data_schema=step_user_data_schema(user_input[CONF_HOST]),
+            errors=errors,
         )
 
     @staticmethod
@@ -106,6 +248,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def async_get_options_flow(config_entry):
         return HottohOptionsFlowHandler(config_entry)
 
+
 class HottohOptionsFlowHandler(config_entries.OptionsFlow):
     """Hottoh config flow options handler."""
 
@@ -126,5 +269,6 @@ class HottohOptionsFlowHandler(config_entries.OptionsFlow):
 
         return self.async_show_form(step_id="user", data_schema=vol.Schema(schema))
 
+
 class InvalidAuth(HomeAssistantError):
     """Error to indicate there is invalid auth."""
@@ -2,12 +2,40 @@
 
 DOMAIN = "hottoh"
 PLATFORMS: list[str] = ["climate", "sensor", "switch", "binary_sensor"]
+# Capability a stove needs for a platform to have entities, platforms of
+# other stoves are never set up
+PLATFORM_CAPABILITIES = {"binary_sensor": "pump"}
+FORWARDED_PLATFORMS = "forwarded_platforms"
 HOTTOH_DEFAULT_HOST = "192.168.4.10"
 HOTTOH_DEFAULT_PORT = 5001
 HOTTOH_SESSION = "hottoh_session"
 CANCEL_STOP = "cancel_stop"
+COORDINATOR = "coordinator"
+SESSION_CACHE = "session_cache"
+# Service field naming the config entry of the stove a service acts on
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+STORAGE_VERSION = 1
+# Seconds a session validated by the config flow waits for its entry
+SESSION_CACHE_TIMEOUT = 300
 CONF_AWAY_TEMP = "away_temp"
 CONF_ECO_TEMP = "eco_temp"
 CONF_COMFORT_TEMP = "comfort_temp"
+CONF_PUSH_UPDATES = "push_updates"
+CONF_CONFIRM_TIMEOUT = "confirm_timeout"
+DEFAULT_CONFIRM_TIMEOUT = 10
+CONF_MIN_INTERVAL = "min_interval"
+DEFAULT_MIN_INTERVAL = 1.0
+CONF_MAX_INTERVAL = "max_interval"
+DEFAULT_MAX_INTERVAL = 60.0
+# Sensor values moving less than their deadband are written at most every
+# max age seconds
+CONF_TEMPERATURE_DEADBAND = "temperature_deadband"
+DEFAULT_TEMPERATURE_DEADBAND = 0.2
+CONF_SMOKE_DEADBAND = "smoke_deadband"
+DEFAULT_SMOKE_DEADBAND = 1.0
+CONF_SPEED_DEADBAND = "speed_deadband"
+DEFAULT_SPEED_DEADBAND = 5.0
+CONF_MAX_AGE = "max_age"
+DEFAULT_MAX_AGE = 900
 
-FAN_SPEED_RANGE = (1,6)
+FAN_SPEED_RANGE = (1, 6)
@@ -0,0 +1,372 @@
+"""DataUpdateCoordinator for the HottoH integration."""
+
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import asdict, replace
+from datetime import timedelta
+import logging
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import (
+    DOMAIN,
+    DEFAULT_CONFIRM_TIMEOUT,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    STORAGE_VERSION,
+)
+from .models import StoveCapabilities, StoveState
+from hottohpy import Hottoh
+
+_LOGGER = logging.getLogger(__name__)
+
+SCAN_INTERVAL = timedelta(seconds=10)
+
+# Actions of the stove during which its values change quickly
+TRANSITION_ACTIONS = frozenset(
+    {
+        "check",
+        "clean_all",
+        "loading",
+        "waiting",
+        "ignition",
+        "stabilization",
+        "stopping",
+    }
+)
+IDLE_ACTIONS = frozenset({"off", "idle"})
+# Interval while heating steadily, within the configured bounds
+STEADY_INTERVAL = 10.0
+# Smoke temperature change, in °C per minute, handled as a transition
+SMOKE_RATE_THRESHOLD = 5.0
+# Smoke fan speed change, in percent, handled as a transition
+FAN_SPEED_THRESHOLD = 5.0
+
+
+def adaptive_interval(
+    state: StoveState,
+    previous: StoveState | None,
+    elapsed: float,
+    fast: float,
+    slow: float,
+) -> float:
+    """Return the delay before the next frame of a stove in state.
+
+    previous is the state read elapsed seconds earlier, None if unknown.
+    Rates are only measured over STEADY_INTERVAL seconds or more, so that
+    the jitter of back to back frames does not read as a transition.
+    """
+    resting = state.action in IDLE_ACTIONS
+    # A stove switched on or off updates is_on before its action, while a
+    # stove on in eco stop keeps resting
+    switching = (
+        state.is_on is not None
+        and state.is_on == resting
+        and (previous is None or previous.is_on != state.is_on)
+    )
+    if state.action in TRANSITION_ACTIONS or switching:
+        return fast
+    if resting or not state.is_on:
+        return slow
+    if previous is not None and elapsed >= STEADY_INTERVAL:
+        smoke, previous_smoke = state.smoke_temperature, previous.smoke_temperature
+        if (
+            smoke is not None
+            and previous_smoke is not None
+            and abs(smoke - previous_smoke) * 60 / elapsed >= SMOKE_RATE_THRESHOLD
+        ):
+            return fast
+        fan, previous_fan = state.speed_fan_smoke, previous.speed_fan_smoke
+        if fan != previous_fan and (
+            fan is None
+            or not previous_fan
+            or abs(fan - previous_fan) * 100 / abs(previous_fan) >= FAN_SPEED_THRESHOLD
+        ):
+            return fast
+    return min(max(STEADY_INTERVAL, fast), slow)
+
+
+def capabilities_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """Return the storage of the capabilities of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+
+
+class HottohDataUpdateCoordinator(DataUpdateCoordinator[StoveState]):
+    """Take one snapshot of a stove per cycle and share it with every entity."""
+
+    config_entry: ConfigEntry
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        hottoh: Hottoh,
+        push: bool = True,
+        confirm_timeout: float = DEFAULT_CONFIRM_TIMEOUT,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            config_entry=config_entry,
+            name=DOMAIN,
+            # Frames pushed by the stove replace the timer in push mode
+            update_interval=None if push else SCAN_INTERVAL,
+        )
+        self.api = hottoh
+        self.push = push
+        self._unsub_frame = None
+        self._notified_data: StoveState | None = None
+        self._notified_success = True
+        self.changed_fields: frozenset[str] | None = None
+        self.state_writes = 0
+        self.skipped_writes = 0
+        # State writes of sensors held back by their deadband
+        self.suppressed_writes = 0
+        self.confirm_timeout = confirm_timeout
+        self.rolled_back = 0
+        self._stove_state: StoveState | None = None
+        self._optimistic: dict[str, tuple[object, object]] = {}
+        self._unsub_expire: set[CALLBACK_TYPE] = set()
+        self.capabilities: StoveCapabilities | None = None
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.interval = min_interval
+        # Recent states, the first one is the newest read STEADY_INTERVAL
+        # seconds ago or more
+        self._interval_history: deque[tuple[float, StoveState]] = deque()
+        self._store = capabilities_store(hass, config_entry.entry_id)
+        self._identity_changed = False
+
+    async def async_load_capabilities(self) -> bool:
+        """Load the capabilities saved by a previous setup, False if none."""
+        data = await self._store.async_load()
+        if data is None:
+            return False
+        try:
+            self.capabilities = StoveCapabilities(**data)
+        except TypeError:
+            _LOGGER.debug("Ignore outdated capabilities of %s", self.config_entry.title)
+            return False
+        return True
+
+    async def async_save_capabilities(self) -> bool:
+        """Read the capabilities of the stove and save them if they changed.
+
+        Return True if they differ from the ones the entities were created with.
+        """
+        capabilities = StoveCapabilities.from_hottoh(self.api)
+        if capabilities == self.capabilities:
+            return False
+        changed = self.capabilities is not None
+        self.capabilities = capabilities
+        await self._store.async_save(asdict(capabilities))
+        return changed
+
+    async def async_refresh_capabilities(self) -> None:
+        """Wait for the first frame of a stove set up from its saved capabilities.
+
+        The entry is reloaded if the stove no longer matches them.
+        """
+        await self.api.client.async_wait_first_frame()
+        if not self.push:
+            await self.async_refresh()
+        elif self.data is None:
+            self._async_handle_frame()
+        if await self.async_save_capabilities():
+            _LOGGER.info(
+                "Capabilities of %s changed, reloading", self.capabilities.name
+            )
+            self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
+
+    @callback
+    def _async_check_identity(self, state: StoveState) -> None:
+        """Reload the entry once the stove reports another name or firmware.
+
+        Entities resolve their name, unique id and device once, when created.
+        """
+        capabilities = self.capabilities
+        if (
+            capabilities is None
+            or self._identity_changed
+            or state.name is None
+            or (state.name, state.firmware)
+            == (capabilities.name, capabilities.firmware)
+        ):
+            return
+        self._identity_changed = True
+        self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_reload_identity(),
+            f"hottoh identity {self.config_entry.entry_id}",
+        )
+
+    async def _async_reload_identity(self) -> None:
+        if await self.async_save_capabilities():
+            _LOGGER.info("Stove %s changed identity, reloading", self.capabilities.name)
+            self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
+
+    @callback
+    def async_start_push(self) -> None:
+        """Update entities every time the stove client completes a frame."""
+        self._unsub_frame = self.api.client.add_frame_listener(self._async_handle_frame)
+
+    @callback
+    def async_stop_push(self) -> None:
+        """Stop listening to frames of the stove client."""
+        if self._unsub_frame is not None:
+            self._unsub_frame()
+            self._unsub_frame = None
+
+    @callback
+    def async_watch_connection(self) -> CALLBACK_TYPE:
+        """Mark every entity unavailable at once when the connection drops.
+
+        They are available again with the next frame, or the next refresh
+        in polling mode.
+        """
+        return self.api.client.add_connection_listener(self._async_handle_connection)
+
+    @callback
+    def _async_handle_connection(self, connected: bool) -> None:
+        if not connected and self.last_update_success:
+            self.async_set_update_error(UpdateFailed("Connection to the stove lost"))
+
+    @callback
+    def _async_handle_frame(self) -> None:
+        """Share a newly received frame with the entities."""
+        self._stove_state = StoveState.from_hottoh(self.api)
+        self._async_check_identity(self._stove_state)
+        data = self._apply_optimistic(self._stove_state)
+        self._adapt_interval(self._stove_state)
+        self.async_set_updated_data(data)
+
+    def _adapt_interval(self, state: StoveState) -> None:
+        """Read the stove faster during transitions, slower when it rests.
+
+        Commands waiting to be read back keep the fast interval.
+        """
+        now = time.monotonic()
+        history = self._interval_history
+        while len(history) > 1 and now - history[1][0] >= STEADY_INTERVAL:
+            history.popleft()
+        then, previous = history[0] if history else (now, None)
+        history.append((now, state))
+        if self._optimistic:
+            self._set_interval(self.min_interval)
+            return
+        self._set_interval(
+            adaptive_interval(
+                state, previous, now - then, self.min_interval, self.max_interval
+            )
+        )
+
+    def _set_interval(self, interval: float) -> None:
+        self.interval = interval
+        self.api.client.frame_interval = interval
+        if not self.push:
+            self.update_interval = timedelta(seconds=interval)
+
+    @callback
+    def async_set_optimistic(self, **values) -> None:
+        """Show values sent to the stove before it confirms them.
+
+        Each value is kept until a frame reads it back, or rolled back to the
+        value of the stove after confirm_timeout seconds, or after the frame
+        interval if longer. Frames are read at the fast interval meanwhile.
+        """
+        # The refresh already scheduled may be a whole slow interval away
+        timeout = max(self.confirm_timeout, self.interval)
+        self._set_interval(self.min_interval)
+        token = object()
+        for field, value in values.items():
+            self._optimistic[field] = (value, token)
+
+        @callback
+        def _async_expire(_now) -> None:
+            self._unsub_expire.discard(unsub)
+            expired = [
+                field
+                for field, (_, field_token) in self._optimistic.items()
+                if field_token is token
+            ]
+            for field in expired:
+                del self._optimistic[field]
+                self.rolled_back += 1
+                _LOGGER.debug("Stove did not confirm %s, rolled back", field)
+            if expired:
+                self._async_publish_optimistic()
+
+        unsub = async_call_later(self.hass, timeout, _async_expire)
+        self._unsub_expire.add(unsub)
+        self._async_publish_optimistic()
+
+    @callback
+    def _async_publish_optimistic(self) -> None:
+        if self._stove_state is None:
+            return
+        self.data = self._apply_optimistic(self._stove_state)
+        self.async_update_listeners()
+
+    def _apply_optimistic(self, state: StoveState) -> StoveState:
+        """Return state with the values not yet confirmed by the stove."""
+        if not self._optimistic:
+            return state
+        values = {}
+        for field, (value, _) in list(self._optimistic.items()):
+            if getattr(state, field) == value:
+                del self._optimistic[field]
+            else:
+                values[field] = value
+        return replace(state, **values) if values else state
+
+    async def async_shutdown(self) -> None:
+        """Cancel the rollback of optimistic values."""
+        await super().async_shutdown()
+        for unsub in self._unsub_expire:
+            unsub()
+        self._unsub_expire.clear()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Wake only the entities bound to a field that changed.
+
+        Entities register the fields they read as their listener context. All
+        of them are woken on the first data and when the update status flips.
+        """
+        data = self.data
+        previous, self._notified_data = self._notified_data, data
+        success, self._notified_success = (
+            self._notified_success,
+            self.last_update_success,
+        )
+        if previous is None or data is None or success != self.last_update_success:
+            self.changed_fields = None
+        else:
+            self.changed_fields = data.diff(previous)
+
+        changed = self.changed_fields
+        for update_callback, fields in list(self._listeners.values()):
+            if changed is None or fields is None or not changed.isdisjoint(fields):
+                self.state_writes += 1
+                update_callback()
+            else:
+                self.skipped_writes += 1
+
+    async def _async_update_data(self) -> StoveState:
+        """Read the values of the last frame received from the stove."""
+        if not self.api.is_connected():
+            raise UpdateFailed("Stove is not connected")
+        self._stove_state = StoveState.from_hottoh(self.api)
+        self._async_check_identity(self._stove_state)
+        data = self._apply_optimistic(self._stove_state)
+        self._adapt_interval(self._stove_state)
+        return data
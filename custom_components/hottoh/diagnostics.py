@@ -0,0 +1,49 @@
+"""Diagnostics support for HottoH."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import COORDINATOR, DOMAIN
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][COORDINATOR]
+    client = coordinator.api.client
+    capabilities = coordinator.capabilities
+    return {
+        "entry": {
+            "data": async_redact_data(config_entry.data, TO_REDACT),
+            "options": async_redact_data(config_entry.options, TO_REDACT),
+        },
+        "capabilities": asdict(capabilities) if capabilities is not None else None,
+        "client": {
+            "connected": client.is_connected(),
+            "frame_interval": client.frame_interval,
+            "queue_depth": client.queue_depth,
+            **client.stats.as_dict(time.monotonic()),
+        },
+        "coordinator": {
+            "push": coordinator.push,
+            "interval": coordinator.interval,
+            "min_interval": coordinator.min_interval,
+            "max_interval": coordinator.max_interval,
+            "last_update_success": coordinator.last_update_success,
+            "state_writes": coordinator.state_writes,
+            "skipped_writes": coordinator.skipped_writes,
+            "suppressed_writes": coordinator.suppressed_writes,
+            "rolled_back": coordinator.rolled_back,
+        },
+    }
@@ -0,0 +1,51 @@
+"""Find HottoH wifi modules on the local network."""
+
+from __future__ import annotations
+
+import asyncio
+from ipaddress import IPv4Network, ip_network
+import logging
+
+from .const import HOTTOH_DEFAULT_PORT
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE_TIMEOUT = 0.5
+SCAN_CONCURRENCY = 64
+
+
+async def async_probe(
+    host: str, port=HOTTOH_DEFAULT_PORT, timeout=PROBE_TIMEOUT
+) -> bool:
+    """Return True if host accepts connections on port."""
+    try:
+        async with asyncio.timeout(timeout):
+            _, writer = await asyncio.open_connection(host, port)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+async def async_scan(
+    network: str | IPv4Network,
+    port=HOTTOH_DEFAULT_PORT,
+    timeout=PROBE_TIMEOUT,
+    concurrency=SCAN_CONCURRENCY,
+) -> list[str]:
+    """Return the hosts of network listening on port.
+
+    At most concurrency hosts are probed at the same time, so a /24 takes
+    about 254 / concurrency probe timeouts.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _probe(host: str) -> bool:
+        async with semaphore:
+            return await async_probe(host, port, timeout)
+
+    hosts = [str(host) for host in ip_network(network, strict=False).hosts()]
+    results = await asyncio.gather(*(_probe(host) for host in hosts))
+    found = [host for host, result in zip(hosts, results) if result]
+    _LOGGER.debug("Found %s listening on port %s in %s", found, port, network)
+    return found
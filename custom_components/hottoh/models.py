@@ -0,0 +1,162 @@
+"""Data models of the HottoH integration."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any
+
+from hottohpy import Hottoh
+
+
+def _read(getter: Callable[[], Any]) -> Any:
+    """Return the value of a getter, None if the stove does not send it."""
+    try:
+        return getter()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class StoveState:
+    """Values of a stove, decoded once per received frame."""
+
+    name: str | None
+    firmware: str | None
+    manufacturer: str | None
+    action: str | None
+    mode: str | None
+    is_on: bool | None
+    eco_mode: bool | None
+    chrono_mode: bool | None
+    water_pump: bool | None
+    smoke_temperature: float | None
+    speed_fan_smoke: float | None
+    temperature_room_1: float | None
+    set_temperature_room_1: float | None
+    set_min_temperature_room_1: float | None
+    set_max_temperature_room_1: float | None
+    temperature_room_2: float | None
+    set_temperature_room_2: float | None
+    set_min_temperature_room_2: float | None
+    set_max_temperature_room_2: float | None
+    temperature_room_3: float | None
+    set_temperature_room_3: float | None
+    set_min_temperature_room_3: float | None
+    set_max_temperature_room_3: float | None
+    water_temperature: float | None
+    set_water_temperature: float | None
+    set_min_water_temperature: float | None
+    set_max_water_temperature: float | None
+    speed_fan_1: int | None
+    set_speed_fan_1: int | None
+    set_max_speed_fan_1: int | None
+    speed_fan_2: float | None
+    set_speed_fan_2: float | None
+    set_max_speed_fan_2: float | None
+    speed_fan_3: float | None
+    set_speed_fan_3: float | None
+    set_max_speed_fan_3: float | None
+    air_ex_1: float | None
+    air_ex_2: float | None
+    air_ex_3: float | None
+    power_level: float | None
+    set_power_level: float | None
+    set_min_power_level: float | None
+    set_max_power_level: float | None
+
+    def diff(self, other: StoveState) -> frozenset[str]:
+        """Return the names of the fields whose value differs from other."""
+        return frozenset(
+            field
+            for field, value, other_value in zip(_FIELDS, _values(self), _values(other))
+            if value != other_value
+        )
+
+    @classmethod
+    def from_hottoh(cls, hottoh: Hottoh) -> StoveState:
+        """Decode the last frame received by a Hottoh session."""
+        return cls(
+            name=_read(hottoh.get_name),
+            firmware=_read(hottoh.get_firmware),
+            manufacturer=_read(hottoh.get_manufacturer),
+            action=_read(hottoh.get_action),
+            mode=_read(hottoh.get_mode),
+            is_on=_read(hottoh.get_is_on),
+            eco_mode=_read(hottoh.get_eco_mode),
+            chrono_mode=_read(hottoh.get_chrono_mode),
+            water_pump=_read(hottoh.get_water_pump),
+            smoke_temperature=_read(hottoh.get_smoke_temperature),
+            speed_fan_smoke=_read(hottoh.get_speed_fan_smoke),
+            temperature_room_1=_read(hottoh.get_temperature_room_1),
+            set_temperature_room_1=_read(hottoh.get_set_temperature_room_1),
+            set_min_temperature_room_1=_read(hottoh.get_set_min_temperature_room_1),
+            set_max_temperature_room_1=_read(hottoh.get_set_max_temperature_room_1),
+            temperature_room_2=_read(hottoh.get_temperature_room_2),
+            set_temperature_room_2=_read(hottoh.get_set_temperature_room_2),
+            set_min_temperature_room_2=_read(hottoh.get_set_min_temperature_room_2),
+            set_max_temperature_room_2=_read(hottoh.get_set_max_temperature_room_2),
+            temperature_room_3=_read(hottoh.get_temperature_room_3),
+            set_temperature_room_3=_read(hottoh.get_set_temperature_room_3),
+            set_min_temperature_room_3=_read(hottoh.get_set_min_temperature_room_3),
+            set_max_temperature_room_3=_read(hottoh.get_set_max_temperature_room_3),
+            water_temperature=_read(hottoh.get_water_temperature),
+            set_water_temperature=_read(hottoh.get_set_water_temperature),
+            set_min_water_temperature=_read(hottoh.get_set_min_water_temperature),
+            set_max_water_temperature=_read(hottoh.get_set_max_water_temperature),
+            speed_fan_1=_read(hottoh.get_speed_fan_1),
+            set_speed_fan_1=_read(hottoh.get_set_speed_fan_1),
+            set_max_speed_fan_1=_read(hottoh.get_set_max_speed_fan_1),
+            speed_fan_2=_read(hottoh.get_speed_fan_2),
+            set_speed_fan_2=_read(hottoh.get_set_speed_fan_2),
+            set_max_speed_fan_2=_read(hottoh.get_set_max_speed_fan_2),
+            speed_fan_3=_read(hottoh.get_speed_fan_3),
+            set_speed_fan_3=_read(hottoh.get_set_speed_fan_3),
+            set_max_speed_fan_3=_read(hottoh.get_set_max_speed_fan_3),
+            air_ex_1=_read(hottoh.get_air_ex_1),
+            air_ex_2=_read(hottoh.get_air_ex_2),
+            air_ex_3=_read(hottoh.get_air_ex_3),
+            power_level=_read(hottoh.get_power_level),
+            set_power_level=_read(hottoh.get_set_power_level),
+            set_min_power_level=_read(hottoh.get_set_min_power_level),
+            set_max_power_level=_read(hottoh.get_set_max_power_level),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class StoveCapabilities:
+    """Static description of a stove, enough to create its entities.
+
+    Persisted after the first successful connection so the entities of a
+    known stove are created before it answers.
+    """
+
+    name: str
+    firmware: str | None
+    manufacturer: str | None
+    fan_number: int
+    temp_room_1: bool
+    temp_room_2: bool
+    temp_room_3: bool
+    temp_water: bool
+    pump: bool
+
+    @classmethod
+    def from_hottoh(cls, hottoh: Hottoh) -> StoveCapabilities:
+        """Read the capabilities from the last frame of a Hottoh session."""
+        return cls(
+            name=hottoh.get_name(),
+            firmware=hottoh.get_firmware(),
+            manufacturer=hottoh.get_manufacturer(),
+            fan_number=hottoh.getFanNumber(),
+            temp_room_1=bool(hottoh.isTempRoom1Enabled()),
+            temp_room_2=bool(hottoh.isTempRoom2Enabled()),
+            temp_room_3=bool(hottoh.isTempRoom3Enabled()),
+            temp_water=bool(hottoh.isTempWaterEnabled()),
+            pump=bool(hottoh.isPumpEnabled()),
+        )
+
+
+_FIELDS = StoveState.__slots__
+_values = attrgetter(*_FIELDS)
@@ -0,0 +1,108 @@
+"""Frame encoding and decoding of the HottoH TCP protocol.
+
+A frame is ``#`` followed by a 17 characters header, the ``;`` terminated
+parameters and a CRC16 (CCITT-FALSE) of everything between ``#`` and the CRC::
+
+    #00000C---0002DATR0;1A2B
+
+    00000  socket id
+    C---   frame flags
+    0002   length of the parameters, hexadecimal
+    DAT    command
+    R      mode, R(ead), W(rite) or E(xecute)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+FRAME_START = b"#"
+FRAME_END = b"\n"
+HEADER_LENGTH = 17
+CRC_LENGTH = 4
+
+
+class HottohProtocolError(Exception):
+    """Error to indicate a malformed frame."""
+
+
+class HottohCrcError(HottohProtocolError):
+    """Error to indicate a frame with a wrong CRC."""
+
+
+def _crc_table() -> tuple[int, ...]:
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data: bytes) -> int:
+    """Return the CRC16 CCITT-FALSE of data."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+@dataclass(frozen=True, slots=True)
+class Frame:
+    """A decoded protocol frame."""
+
+    command: str
+    mode: str
+    parameters: list[str]
+    socket_id: int = 0
+
+
+def encode_frame(command, mode="R", parameters=("0",), socket_id=0) -> bytes:
+    """Build the raw bytes of a frame."""
+    params = "".join(str(value) + ";" for value in parameters)
+    body = f"{socket_id:05d}C---{len(params):04X}{command}{mode}{params}"
+    crc = crc16(body.encode("utf-8"))
+    return FRAME_START + f"{body}{crc:04X}".encode("utf-8") + FRAME_END
+
+
+def decode_header(header: bytes) -> tuple[int, str, str, int]:
+    """Return socket id, command, mode and parameters length of a header."""
+    if len(header) != HEADER_LENGTH:
+        raise HottohProtocolError(f"Invalid header length: {header!r}")
+    try:
+        text = header.decode("utf-8")
+        socket_id = int(text[0:5])
+        length = int(text[9:13], 16)
+    except (UnicodeDecodeError, ValueError) as err:
+        raise HottohProtocolError(f"Invalid header: {header!r}") from err
+    return socket_id, text[13:16], text[16], length
+
+
+def decode_frame(header: bytes, payload: bytes) -> Frame:
+    """Decode a frame from its header and its parameters followed by the CRC."""
+    socket_id, command, mode, length = decode_header(header)
+    if len(payload) != length + CRC_LENGTH:
+        raise HottohProtocolError(f"Invalid payload length: {payload!r}")
+    params, crc = payload[:length], payload[length:]
+    try:
+        expected = int(crc, 16)
+    except ValueError as err:
+        raise HottohCrcError(f"Invalid CRC: {crc!r}") from err
+    if crc16(header + params) != expected:
+        raise HottohCrcError(f"CRC mismatch on {command} frame")
+    parameters = params.decode("utf-8").split(";")
+    if parameters and parameters[-1] == "":
+        parameters.pop()
+    return Frame(command, mode, parameters, socket_id)
+
+
+def parse_frame(raw: bytes) -> Frame:
+    """Decode a complete frame, as produced by encode_frame."""
+    raw = raw.strip()
+    if not raw.startswith(FRAME_START):
+        raise HottohProtocolError(f"Missing frame start: {raw!r}")
+    return decode_frame(raw[1 : 1 + HEADER_LENGTH], raw[1 + HEADER_LENGTH :])
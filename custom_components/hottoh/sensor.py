@@ -1,185 +1,399 @@
 """Support for Hottoh Climate Entity."""
 
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
 import logging
+from operator import attrgetter
+import time
+from typing import Any
 
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.components.sensor.const import SensorDeviceClass
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
+from homeassistant.components.sensor.const import SensorDeviceClass, SensorStateClass
 
-from homeassistant.const import UnitOfTemperature, PERCENTAGE
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.const import (
+    EntityCategory,
+    UnitOfTemperature,
+    UnitOfTime,
+    PERCENTAGE,
+)
 
-from .const import DOMAIN, HOTTOH_SESSION
+from .const import (
+    DOMAIN,
+    COORDINATOR,
+    CONF_MAX_AGE,
+    CONF_SMOKE_DEADBAND,
+    CONF_SPEED_DEADBAND,
+    CONF_TEMPERATURE_DEADBAND,
+    DEFAULT_MAX_AGE,
+    DEFAULT_SMOKE_DEADBAND,
+    DEFAULT_SPEED_DEADBAND,
+    DEFAULT_TEMPERATURE_DEADBAND,
+)
+from .client import HottohAsyncClient
+from .models import StoveCapabilities, StoveState
 from . import HottohEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class Deadband:
+    """Option holding the smallest change of a sensor worth a state write."""
+
+    option: str
+    default: float
+    # Percentage of the previous value rather than an absolute change
+    relative: bool = False
+
+
+TEMPERATURE_DEADBAND = Deadband(CONF_TEMPERATURE_DEADBAND, DEFAULT_TEMPERATURE_DEADBAND)
+SMOKE_DEADBAND = Deadband(CONF_SMOKE_DEADBAND, DEFAULT_SMOKE_DEADBAND)
+SPEED_DEADBAND = Deadband(CONF_SPEED_DEADBAND, DEFAULT_SPEED_DEADBAND, relative=True)
+
+SPEED_UNIT = "g/m"
+
+
+def is_significant(old, new, deadband: float, relative=False) -> bool:
+    """Return True if new moved from old by deadband or more.
+
+    deadband is a percentage of old if relative, an absolute change otherwise.
+    Values which are not both numbers are significant when they differ.
+    """
+    if old is None or new is None or deadband <= 0:
+        return old != new
+    change = abs(new - old)
+    if relative:
+        if old == 0:
+            return new != 0
+        change = change * 100 / abs(old)
+    # Tenths of degree do not add up exactly in binary
+    return round(change, 6) >= deadband
+
+
+@dataclass(frozen=True, kw_only=True)
+class HottohSensorEntityDescription(SensorEntityDescription):
+    """Sensor reading a StoveState field, with its setpoint and limits if any."""
+
+    value_fn: Callable[[StoveState], Any]
+    set_value_fn: Callable[[StoveState], Any] | None = None
+    min_value_fn: Callable[[StoveState], Any] | None = None
+    max_value_fn: Callable[[StoveState], Any] | None = None
+    # StoveState fields read by the accessors, the state is written when
+    # one of them changes
+    fields: tuple[str, ...] = ()
+    exists_fn: Callable[[StoveCapabilities], bool] = lambda capabilities: True
+    deadband: Deadband | None = None
+
+
+@dataclass(frozen=True, kw_only=True)
+class HottohDiagnosticSensorEntityDescription(SensorEntityDescription):
+    """Sensor reading a health counter of the client."""
+
+    value_fn: Callable[[HottohAsyncClient, float], Any]
+
+
+def _optional_getter(field):
+    """Return a getter of a StoveState field, None if there is no such field."""
+    if field in StoveState.__slots__:
+        return attrgetter(field)
+    return None
+
+
+def _stove_sensor(key, icon, device_class=None, unit=None, **kwargs):
+    """Describe the sensor of StoveState field key and its setpoint fields."""
+    fields = tuple(
+        field
+        for field in (key, "set_" + key, "set_min_" + key, "set_max_" + key)
+        if field in StoveState.__slots__
+    )
+    return HottohSensorEntityDescription(
+        key=key,
+        icon=icon,
+        device_class=device_class,
+        native_unit_of_measurement=unit,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=attrgetter(key),
+        set_value_fn=_optional_getter("set_" + key),
+        min_value_fn=_optional_getter("set_min_" + key),
+        max_value_fn=_optional_getter("set_max_" + key),
+        fields=fields,
+        **kwargs,
+    )
+
+
+SENSORS = (
+    HottohSensorEntityDescription(
+        key="action", value_fn=attrgetter("action"), fields=("action",)
+    ),
+    _stove_sensor(
+        "smoke_temperature",
+        "mdi:smoke",
+        SensorDeviceClass.TEMPERATURE,
+        UnitOfTemperature.CELSIUS,
+        deadband=SMOKE_DEADBAND,
+    ),
+    _stove_sensor(
+        "speed_fan_smoke", "mdi:fan", unit=SPEED_UNIT, deadband=SPEED_DEADBAND
+    ),
+    _stove_sensor(
+        "temperature_room_1",
+        "mdi:thermometer",
+        SensorDeviceClass.TEMPERATURE,
+        UnitOfTemperature.CELSIUS,
+        exists_fn=attrgetter("temp_room_1"),
+        deadband=TEMPERATURE_DEADBAND,
+    ),
+    _stove_sensor(
+        "temperature_room_2",
+        "mdi:thermometer",
+        SensorDeviceClass.TEMPERATURE,
+        UnitOfTemperature.CELSIUS,
+        exists_fn=attrgetter("temp_room_2"),
+        deadband=TEMPERATURE_DEADBAND,
+    ),
+    _stove_sensor(
+        "temperature_room_3",
+        "mdi:thermometer",
+        SensorDeviceClass.TEMPERATURE,
+        UnitOfTemperature.CELSIUS,
+        exists_fn=attrgetter("temp_room_3"),
+        deadband=TEMPERATURE_DEADBAND,
+    ),
+    _stove_sensor(
+        "water_temperature",
+        "mdi:water-boiler",
+        SensorDeviceClass.TEMPERATURE,
+        UnitOfTemperature.CELSIUS,
+        exists_fn=attrgetter("temp_water"),
+        deadband=TEMPERATURE_DEADBAND,
+    ),
+    *(
+        _stove_sensor(
+            key + str(fan),
+            icon,
+            SensorDeviceClass.POWER_FACTOR,
+            PERCENTAGE,
+            exists_fn=lambda capabilities, fan=fan: capabilities.fan_number >= fan,
+        )
+        for fan in range(1, 4)
+        for key, icon in (("speed_fan_", "mdi:fan"), ("air_ex_", "mdi:air-filter"))
+    ),
+    _stove_sensor("power_level", "mdi:fan", SensorDeviceClass.POWER_FACTOR, PERCENTAGE),
+)
+
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add sensors for passed config_entry in HA."""
     domain_data = hass.data[DOMAIN][config_entry.entry_id]
-    hottoh = domain_data[HOTTOH_SESSION]
-
-    entities = []
-    entities.append(HottohActionSensor(hottoh))
-    entities.append(
-        HottohSensor(
-            hottoh,
-            "smoke_temperature",
-            "mdi:smoke",
-            SensorDeviceClass.TEMPERATURE,
-            UnitOfTemperature.CELSIUS,
-        )
+    coordinator = domain_data[COORDINATOR]
+    capabilities = coordinator.capabilities
+
+    entities = [
+        HottohSensor(coordinator, description)
+        for description in SENSORS
+        if description.exists_fn(capabilities)
+    ]
+    entities.extend(
+        HottohDiagnosticSensor(coordinator, description)
+        for description in DIAGNOSTIC_SENSORS
     )
-    entities.append(HottohSensor(hottoh, "speed_fan_smoke", "mdi:fan", "", "g/m"))
-
-    if hottoh.isTempRoom1Enabled():
-        entities.append(
-            HottohSensor(
-                hottoh,
-                "temperature_room_1",
-                "mdi:thermometer",
-                SensorDeviceClass.TEMPERATURE,
-                UnitOfTemperature.CELSIUS,
-            )
-        )
-    if hottoh.isTempRoom2Enabled():
-        entities.append(
-            HottohSensor(
-                hottoh,
-                "temperature_room_2",
-                "mdi:thermometer",
-                SensorDeviceClass.TEMPERATURE,
-                UnitOfTemperature.CELSIUS,
-            )
-        )
-    if hottoh.isTempRoom3Enabled():
-        entities.append(
-            HottohSensor(
-                hottoh,
-                "temperature_room_3",
-                "mdi:thermometer",
-                SensorDeviceClass.TEMPERATURE,
-                UnitOfTemperature.CELSIUS,
-            )
-        )
-    if hottoh.isTempWaterEnabled():
-        entities.append(
-            HottohSensor(
-                hottoh,
-                "water_temperature",
-                "mdi:water-boiler",
-                SensorDeviceClass.TEMPERATURE,
-                UnitOfTemperature.CELSIUS,
-            )
-        )
+    async_add_entities(entities)
 
-    for fan in range(1, hottoh.getFanNumber() + 1):
-        entities.append(
-            HottohSensor(
-                hottoh,
-                "speed_fan_" + str(fan),
-                "mdi:fan",
-                SensorDeviceClass.POWER_FACTOR,
-                PERCENTAGE,
-            )
-        )
-        entities.append(
-            HottohSensor(
-                hottoh,
-                "air_ex_" + str(fan),
-                "mdi:air-filter",
-                SensorDeviceClass.POWER_FACTOR,
-                PERCENTAGE,
-            )
-        )
 
-    entities.append(
-        HottohSensor(
-            hottoh, "power_level", "mdi:fan", SensorDeviceClass.POWER_FACTOR, PERCENTAGE
-        )
-    )
+def _mean_latency_ms(client, now):
+    latency = client.stats.mean_latency
+    return None if latency is None else round(latency * 1000, 1)
+
+
+def _last_frame(client, now):
+    last_frame = client.stats.last_frame_time
+    return None if last_frame is None else datetime.fromtimestamp(last_frame, UTC)
 
-    async_add_entities(entities, True)
+
+DIAGNOSTIC_SENSORS = (
+    HottohDiagnosticSensorEntityDescription(
+        key="frames_per_minute",
+        native_unit_of_measurement="frames/min",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda client, now: client.stats.frames_per_minute(now),
+    ),
+    HottohDiagnosticSensorEntityDescription(
+        key="request_latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=_mean_latency_ms,
+    ),
+    HottohDiagnosticSensorEntityDescription(
+        key="crc_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda client, now: client.stats.crc_errors,
+    ),
+    HottohDiagnosticSensorEntityDescription(
+        key="reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda client, now: client.stats.reconnects,
+    ),
+    HottohDiagnosticSensorEntityDescription(
+        key="command_queue",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda client, now: client.queue_depth,
+    ),
+    HottohDiagnosticSensorEntityDescription(
+        key="last_frame",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=_last_frame,
+    ),
+    HottohDiagnosticSensorEntityDescription(
+        key="update_interval",
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda client, now: client.frame_interval,
+    ),
+)
 
 
 class HottohSensor(HottohEntity, SensorEntity):
     """Representation of a Hottoh Sensor"""
 
-    def __init__(self, hottoh, name, icon, device_class, unit_of_measurement):
+    entity_description: HottohSensorEntityDescription
+    # The limits of a setpoint hardly ever change, the recorder would store
+    # them with every attributes row of every sensor
+    _unrecorded_attributes = frozenset({"min_value", "max_value"})
+
+    def __init__(self, coordinator, description):
         """Initialize the Sensor."""
-        HottohEntity.__init__(self, hottoh)
+        HottohEntity.__init__(self, coordinator, description.fields)
         SensorEntity.__init__(self)
-        self.api = hottoh
-        self.nameSet = name
-        self._attr_name = self.api.get_name() + " " + name
-        self._attr_icon = icon
-        self._attr_device_class = device_class
-        self._attr_unit_of_measurement = unit_of_measurement
-        self._attr_unique_id = self.api.get_name() + "_" + name
+        self.entity_description = description
+        self._attr_name = coordinator.capabilities.name + " " + description.key
+        self._attr_unique_id = coordinator.capabilities.name + "_" + description.key
+        options = coordinator.config_entry.options
+        deadband = description.deadband
+        self._deadband = (
+            options.get(deadband.option, deadband.default) if deadband else 0
+        )
+        self._relative = deadband is not None and deadband.relative
+        self._max_age = options.get(CONF_MAX_AGE, DEFAULT_MAX_AGE)
+        self._written: tuple | None = None
+        self._written_at = 0.0
+        self._unsub_heartbeat: Callable[[], None] | None = None
 
-    @property
-    def state(self):
-        return getattr(self.api, "get_" + self.nameSet)()
+    async def async_added_to_hass(self):
+        """Remember the first state written."""
+        await super().async_added_to_hass()
+        self._remember_written()
 
-    @property
-    def state_class(self):
-        return "measurement"
+    async def async_will_remove_from_hass(self):
+        """Cancel the pending heartbeat."""
+        await super().async_will_remove_from_hass()
+        self._cancel_heartbeat()
 
-    @property
-    def min_temp(self):
-        """Return min value"""
-        try:
-            func = getattr(self.api, "get_set_min_" + self.nameSet)()
-        except AttributeError:
-            func = None
-        return func
+    def _snapshot(self) -> tuple:
+        if not self.available:
+            return (False, None, None)
+        return (True, self.native_value, self.extra_state_attributes)
 
-    @property
-    def max_temp(self):
-        """Return max value"""
-        try:
-            func = getattr(self.api, "get_set_max_" + self.nameSet)()
-        except AttributeError:
-            func = None
-        return func
+    def _remember_written(self) -> None:
+        self._written = self._snapshot()
+        self._written_at = time.monotonic()
+
+    def _cancel_heartbeat(self) -> None:
+        if self._unsub_heartbeat is not None:
+            self._unsub_heartbeat()
+            self._unsub_heartbeat = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state, unless the value only moved within its deadband.
+
+        Availability and attribute changes are always written, and so is
+        any change once the last write is max age seconds old, even if no
+        frame comes in by then.
+        """
+        written, snapshot = self._written, self._snapshot()
+        age = time.monotonic() - self._written_at
+        if (
+            written is not None
+            and written[0] == snapshot[0]
+            and written[2] == snapshot[2]
+            and age < self._max_age
+            and not is_significant(
+                written[1], snapshot[1], self._deadband, self._relative
+            )
+        ):
+            self.coordinator.suppressed_writes += 1
+            if self._unsub_heartbeat is None:
+                self._unsub_heartbeat = async_call_later(
+                    self.hass, self._max_age - age, self._async_heartbeat
+                )
+            return
+        self._cancel_heartbeat()
+        self._remember_written()
+        super()._handle_coordinator_update()
+
+    @callback
+    def _async_heartbeat(self, _now) -> None:
+        """Write the value suppressed since the last write, now max age old."""
+        self._unsub_heartbeat = None
+        if self._snapshot() != self._written:
+            self._remember_written()
+            self.async_write_ha_state()
 
     @property
-    def set_temp(self):
-        """Return set value"""
-        try:
-            func = getattr(self.api, "get_set_" + self.nameSet)()
-        except AttributeError:
-            func = None
-        return func
+    def native_value(self):
+        return self.entity_description.value_fn(self.coordinator.data)
 
     @property
     def extra_state_attributes(self):
+        description = self.entity_description
+        data = self.coordinator.data
         attr = {}
-        if self.set_temp is not None:
-            attr["set_value"] = self.set_temp
-        if self.min_temp is not None:
-            attr["min_value"] = self.min_temp
-        if self.max_temp is not None:
-            attr["max_value"] = self.max_temp
+        for name, value_fn in (
+            ("set_value", description.set_value_fn),
+            ("min_value", description.min_value_fn),
+            ("max_value", description.max_value_fn),
+        ):
+            if value_fn is not None and (value := value_fn(data)) is not None:
+                attr[name] = value
         return attr
 
 
-class HottohActionSensor(HottohEntity, SensorEntity):
-    """Representation of a Hottoh Status"""
+class HottohDiagnosticSensor(HottohEntity, SensorEntity):
+    """Health counter of the connection to a stove.
+
+    Polled every SCAN_INTERVAL of the sensor platform rather than written on
+    every frame, and available while the stove is unreachable.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
 
-    def __init__(self, hottoh):
+    entity_description: HottohDiagnosticSensorEntityDescription
+
+    def __init__(self, coordinator, description):
         """Initialize the Sensor."""
-        HottohEntity.__init__(self, hottoh)
+        # No StoveState field, frames never wake it
+        HottohEntity.__init__(self, coordinator, ())
         SensorEntity.__init__(self)
-        self.api = hottoh
+        self.entity_description = description
+        self._attr_name = coordinator.capabilities.name + " " + description.key
+        self._attr_unique_id = coordinator.capabilities.name + "_" + description.key
 
     @property
-    def name(self):
-        return self.api.get_name() + " " + "action"
+    def should_poll(self):
+        return True
 
     @property
-    def unique_id(self):
-        return self.api.get_name() + "_" + "action"
+    def available(self):
+        return True
 
-    @property
-    def state(self):
-        return self.api.get_action()
+    async def async_update(self):
+        """Read the counters of the client, without refreshing the coordinator."""
+        self._attr_native_value = self.entity_description.value_fn(
+            self.api.client, time.monotonic()
+        )
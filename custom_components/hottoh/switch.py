@@ -1,10 +1,10 @@
 """Support for Hottoh Climate Entity."""
-from datetime import timedelta
+
 import logging
 
 from homeassistant.components.switch import SwitchEntity
 
-from .const import DOMAIN, HOTTOH_SESSION
+from .const import DOMAIN, COORDINATOR
 from . import HottohEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -13,65 +13,53 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Add sensors for passed config_entry in HA."""
     domain_data = hass.data[DOMAIN][config_entry.entry_id]
-    hottoh = domain_data[HOTTOH_SESSION]
+    coordinator = domain_data[COORDINATOR]
 
-    switch_on = HottohIsOnSwitch(hottoh)
-    eco_mode = HottohEcoModeSwitch(hottoh)
-    chrono_mode = HottohChronoModeSwitch(hottoh)
+    switch_on = HottohIsOnSwitch(coordinator)
+    eco_mode = HottohEcoModeSwitch(coordinator)
+    chrono_mode = HottohChronoModeSwitch(coordinator)
 
-    async_add_entities([switch_on, eco_mode, chrono_mode], True)
+    async_add_entities([switch_on, eco_mode, chrono_mode])
 
 
 class HottohIsOnSwitch(HottohEntity, SwitchEntity):
     """Representation of a Hottoh Status"""
 
-    def __init__(self, hottoh):
+    def __init__(self, coordinator):
         """Initialize the Sensor."""
-        HottohEntity.__init__(self, hottoh)
+        HottohEntity.__init__(self, coordinator, ("is_on",))
         SwitchEntity.__init__(self)
-        self.api = hottoh
-
-    @property
-    def name(self):
-        return self.api.get_name() + " " + "is_on"
-
-    @property
-    def unique_id(self):
-        return self.api.get_name() + "_" + "is_on"
+        self._attr_name = coordinator.capabilities.name + " " + "is_on"
+        self._attr_unique_id = coordinator.capabilities.name + "_" + "is_on"
 
     @property
     def icon(self):
-        if self.api.get_is_on():
+        if self.coordinator.data is not None and self.coordinator.data.is_on:
             return "mdi:fireplace"
         return "mdi:fireplace-off"
 
     @property
     def is_on(self):
-        return self.api.get_is_on()
+        return self.coordinator.data.is_on
 
-    def turn_on(self):
+    async def async_turn_on(self, **kwargs):
         self.api.set_on()
+        self.coordinator.async_set_optimistic(is_on=True, mode="on")
 
-    def turn_off(self):
+    async def async_turn_off(self, **kwargs):
         self.api.set_off()
+        self.coordinator.async_set_optimistic(is_on=False, mode="off")
 
 
 class HottohEcoModeSwitch(HottohEntity, SwitchEntity):
     """Representation of a Hottoh Status"""
 
-    def __init__(self, hottoh):
+    def __init__(self, coordinator):
         """Initialize the Sensor."""
-        HottohEntity.__init__(self, hottoh)
+        HottohEntity.__init__(self, coordinator, ("eco_mode",))
         SwitchEntity.__init__(self)
-        self.api = hottoh
-
-    @property
-    def name(self):
-        return self.api.get_name() + " " + "is_eco_mode"
-
-    @property
-    def unique_id(self):
-        return self.api.get_name() + "_" + "is_eco_mode"
+        self._attr_name = coordinator.capabilities.name + " " + "is_eco_mode"
+        self._attr_unique_id = coordinator.capabilities.name + "_" + "is_eco_mode"
 
     @property
     def icon(self):
@@ -79,31 +67,26 @@ class HottohEcoModeSwitch(HottohEntity, SwitchEntity):
 
     @property
     def is_on(self):
-        return self.api.get_eco_mode()
+        return self.coordinator.data.eco_mode
 
-    def turn_on(self):
+    async def async_turn_on(self, **kwargs):
         self.api.set_eco_mode_on()
+        self.coordinator.async_set_optimistic(eco_mode=True)
 
-    def turn_off(self):
+    async def async_turn_off(self, **kwargs):
         self.api.set_eco_mode_off()
+        self.coordinator.async_set_optimistic(eco_mode=False)
 
 
 class HottohChronoModeSwitch(HottohEntity, SwitchEntity):
     """Representation of a Hottoh Status"""
 
-    def __init__(self, hottoh):
+    def __init__(self, coordinator):
         """Initialize the Sensor."""
-        HottohEntity.__init__(self, hottoh)
+        HottohEntity.__init__(self, coordinator, ("chrono_mode",))
         SwitchEntity.__init__(self)
-        self.api = hottoh
-
-    @property
-    def name(self):
-        return self.api.get_name() + " " + "is_chrono_mode"
-
-    @property
-    def unique_id(self):
-        return self.api.get_name() + "_" + "is_chrono_mode"
+        self._attr_name = coordinator.capabilities.name + " " + "is_chrono_mode"
+        self._attr_unique_id = coordinator.capabilities.name + "_" + "is_chrono_mode"
 
     @property
     def icon(self):
@@ -111,10 +94,12 @@ class HottohChronoModeSwitch(HottohEntity, SwitchEntity):
 
     @property
     def is_on(self):
-        return self.api.get_chrono_mode()
+        return self.coordinator.data.chrono_mode
 
-    def turn_on(self):
+    async def async_turn_on(self, **kwargs):
         self.api.set_chrono_mode_on()
+        self.coordinator.async_set_optimistic(chrono_mode=True)
 
-    def turn_off(self):
+    async def async_turn_off(self, **kwargs):
         self.api.set_chrono_mode_off()
+        self.coordinator.async_set_optimistic(chrono_mode=False)
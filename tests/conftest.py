@@ -0,0 +1,51 @@
+"""Global fixtures for HottoH integration."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.hottoh import client as client_module
+from custom_components.hottoh.client import HottohAsyncClient
+
+from .const import MOCK_DATA, MOCK_DATA2, MOCK_INFO
+from .simulator import StoveSimulator
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+# Replaces the connection loop of the client by a stove that has already sent
+# a complete frame, and keeps every command queued for inspection.
+@pytest.fixture(name="mock_stove")
+def mock_stove_fixture():
+    """Skip the connection to the stove."""
+
+    def _start(client):
+        client._loop = asyncio.get_running_loop()
+        client._wakeup = asyncio.Event()
+        client._first_frame = asyncio.Event()
+        client._first_frame.set()
+        client._info = list(MOCK_INFO)
+        client._data = list(MOCK_DATA)
+        client._data2 = list(MOCK_DATA2)
+        client._connected = True
+
+    with patch.object(HottohAsyncClient, "start", _start):
+        yield
+
+
+# A simulated stove on a local port, with short timeouts so that faults are
+# detected and recovered from quickly
+@pytest.fixture(name="simulator")
+async def simulator_fixture(socket_enabled):
+    """Start a simulated stove."""
+    with patch.object(client_module, "RECONNECT_DELAY", 0.01), patch.object(
+        client_module, "REQUEST_TIMEOUT", 0.2
+    ):
+        async with StoveSimulator() as simulator:
+            yield simulator
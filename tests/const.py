@@ -0,0 +1,83 @@
+"""Constants for HottoH tests."""
+
+from homeassistant.const import CONF_HOST, CONF_PORT
+
+from custom_components.hottoh.const import (
+    CONF_AWAY_TEMP,
+    CONF_COMFORT_TEMP,
+    CONF_ECO_TEMP,
+)
+
+MOCK_CONFIG = {
+    CONF_HOST: "127.0.0.1",
+    CONF_PORT: 5001,
+    CONF_AWAY_TEMP: 15.0,
+    CONF_COMFORT_TEMP: 20.0,
+    CONF_ECO_TEMP: 18.0,
+}
+
+# Registers of a CMG stove with one fan and the room 1 probe (stove type 5),
+# heating at 21.5°C for a 22°C setpoint
+MOCK_INFO = ["0", "1.0.21", "-45"]
+MOCK_DATA = [
+    "0",
+    "9",
+    "0",
+    "1",
+    "5",
+    "8",
+    "1",
+    "0",
+    "0",
+    "215",
+    "220",
+    "150",
+    "300",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "1350",
+    "3",
+    "3",
+    "1",
+    "5",
+    "45",
+    "3",
+    "3",
+    "6",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+]
+MOCK_DATA2 = [
+    "2",
+    "0",
+    "0",
+    "40",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0",
+]
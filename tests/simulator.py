@@ -0,0 +1,226 @@
+"""Simulated HottoH stove speaking the TCP protocol on a local port."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+
+from custom_components.hottoh.capture import async_replay
+from custom_components.hottoh.protocol import (
+    CRC_LENGTH,
+    FRAME_START,
+    HEADER_LENGTH,
+    HottohProtocolError,
+    decode_frame,
+    decode_header,
+    encode_frame,
+)
+
+from .const import MOCK_DATA, MOCK_DATA2, MOCK_INFO
+
+# Bits of the stove type register, as read by hottohpy
+TYPE_ROOM_1 = 1 << 0
+TYPE_WATER = 1 << 1
+TYPE_FAN_SHIFT = 2
+TYPE_ROOM_2 = 1 << 7
+TYPE_ROOM_3 = 1 << 8
+TYPE_PUMP = 1 << 11
+
+INDEX_MANUFACTURER = 1
+INDEX_STOVE_TYPE = 4
+INDEX_ROOM_1 = 9
+INDEX_ROOM_1_SET = 10
+
+# Index in DAT 0 written by each command register
+WRITE_REGISTERS = {
+    "0": 6,  # on/off
+    "1": 7,  # eco mode
+    "2": 23,  # power level
+    "3": INDEX_ROOM_1_SET,
+    "4": 18,  # water temperature
+    "5": 28,  # fan 1
+    "6": 31,  # fan 2
+    "7": 34,  # fan 3
+    "8": 8,  # chrono mode
+}
+
+
+def stove_type(fan_number=1, room_2=False, room_3=False, water=False, pump=False):
+    """Return the stove type register of a stove with these capabilities."""
+    value = TYPE_ROOM_1 | (fan_number << TYPE_FAN_SHIFT)
+    if room_2:
+        value |= TYPE_ROOM_2
+    if room_3:
+        value |= TYPE_ROOM_3
+    if water:
+        value |= TYPE_WATER
+    if pump:
+        value |= TYPE_PUMP
+    return value
+
+
+class StoveSimulator:
+    """A stove wifi module answering INF and DAT requests.
+
+    Registers start from the MOCK_* frames of the tests. The room temperature
+    drifts towards its setpoint every tick_interval seconds so that frames
+    change over time. Faults are injected per response with the given
+    probabilities, drawn from a seeded random generator:
+
+    - crc_error_rate: the response has a wrong CRC
+    - disconnect_rate: the connection is closed instead of answering
+    - silence_rate: the request is never answered
+    - noise_rate: garbage is sent before the response
+    """
+
+    def __init__(
+        self,
+        manufacturer=9,
+        fan_number=1,
+        room_2=False,
+        room_3=False,
+        water=False,
+        pump=False,
+        tick_interval=None,
+        latency=0.0,
+        crc_error_rate=0.0,
+        disconnect_rate=0.0,
+        silence_rate=0.0,
+        noise_rate=0.0,
+        seed=0,
+    ) -> None:
+        """Create a stopped simulator."""
+        self.info = list(MOCK_INFO)
+        self.data = list(MOCK_DATA)
+        self.data2 = list(MOCK_DATA2)
+        # Unknown manufacturers are named after their code, "Stove 100"
+        self.data[INDEX_MANUFACTURER] = str(manufacturer)
+        self.data[INDEX_STOVE_TYPE] = str(
+            stove_type(fan_number, room_2, room_3, water, pump)
+        )
+        self.tick_interval = tick_interval
+        self.latency = latency
+        self.crc_error_rate = crc_error_rate
+        self.disconnect_rate = disconnect_rate
+        self.silence_rate = silence_rate
+        self.noise_rate = noise_rate
+        self.refuse_connections = False
+        self.connections = 0
+        self.requests = 0
+        self.writes: list[list[str]] = []
+        self.port: int | None = None
+        self._random = random.Random(seed)
+        self._server: asyncio.Server | None = None
+        self._tick_task: asyncio.Task | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def start(self, host="127.0.0.1", port=0) -> int:
+        """Listen on host and port, return the port."""
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.tick_interval:
+            self._tick_task = asyncio.create_task(self._async_tick())
+        return self.port
+
+    async def stop(self) -> None:
+        """Close the server and every connection."""
+        if self._tick_task is not None:
+            self._tick_task.cancel()
+            self._tick_task = None
+        self.drop_connections()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> StoveSimulator:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    def drop_connections(self) -> None:
+        """Close the connections of every client, like a wifi module reboot."""
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    def tick(self) -> None:
+        """Move the room temperature a tenth of degree towards its setpoint."""
+        room = int(self.data[INDEX_ROOM_1])
+        setpoint = int(self.data[INDEX_ROOM_1_SET])
+        if room != setpoint:
+            room += 1 if room < setpoint else -1
+        else:
+            room -= 1
+        self.data[INDEX_ROOM_1] = str(room)
+
+    async def async_replay(self, path, speed=1.0) -> None:
+        """Answer with the registers of a capture, at speed times its pace."""
+        async for dial in async_replay(path, speed):
+            self.info, self.data, self.data2 = dial.info, dial.data, dial.data2
+
+    async def _async_tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.tick()
+
+    async def _handle_client(self, reader, writer) -> None:
+        if self.refuse_connections:
+            writer.close()
+            return
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                await reader.readuntil(FRAME_START)
+                header = await reader.readexactly(HEADER_LENGTH)
+                _, _, _, length = decode_header(header)
+                payload = await reader.readexactly(length + CRC_LENGTH)
+                frame = decode_frame(header, payload)
+                self.requests += 1
+                if not await self._async_answer(frame, writer):
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, HottohProtocolError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _async_answer(self, frame, writer) -> bool:
+        """Answer a request, return False once the connection is closed."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._fault(self.disconnect_rate):
+            return False
+        if self._fault(self.silence_rate):
+            return True
+
+        parameters = self._handle_request(frame.command, frame.mode, frame.parameters)
+        raw = encode_frame(frame.command, frame.mode, parameters, frame.socket_id)
+        if self._fault(self.crc_error_rate):
+            # Change the last digit of the CRC, before the line feed
+            digit = b"1" if raw[-2:-1] == b"0" else b"0"
+            raw = raw[:-2] + digit + raw[-1:]
+        if self._fault(self.noise_rate):
+            raw = b"\x00garbage\n" + raw
+        writer.write(raw)
+        await writer.drain()
+        return True
+
+    def _handle_request(self, command, mode, parameters) -> list[str]:
+        if command == "INF":
+            return self.info
+        if mode == "W":
+            register, value = parameters[0], parameters[1]
+            self.writes.append([register, value])
+            if (index := WRITE_REGISTERS.get(register)) is not None:
+                self.data[index] = str(int(float(value)))
+            return parameters
+        if parameters and parameters[0] == "2":
+            return self.data2
+        return self.data
+
+    def _fault(self, rate) -> bool:
+        return rate > 0 and self._random.random() < rate
@@ -0,0 +1,268 @@
+"""Test the capture and replay of HottoH frames."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.const import CONF_PORT
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.hottoh.capture import (
+    CAPTURE_MAGIC,
+    FRAME_RECEIVED,
+    FRAME_SENT,
+    FrameCapture,
+    HottohCaptureError,
+    async_replay,
+    async_replay_client,
+    iter_dials,
+    read_capture,
+)
+from custom_components.hottoh.const import (
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DOMAIN,
+    HOTTOH_SESSION,
+)
+from custom_components.hottoh.protocol import encode_frame
+
+from .const import MOCK_CONFIG, MOCK_DATA, MOCK_DATA2, MOCK_INFO
+from .simulator import INDEX_ROOM_1
+
+DIALS = 5
+DIAL_INTERVAL = 10.0
+
+
+def _write_capture(path, rooms, start=1_700_000_000.0, corrupt=()):
+    """Write a capture of one dial per room temperature, DIAL_INTERVAL apart.
+
+    The DAT 0 answers of the dials indexed in corrupt have a wrong CRC.
+    """
+    capture = FrameCapture(path)
+    capture.open()
+    for index, room in enumerate(rooms):
+        timestamp = start + index * DIAL_INTERVAL
+        data = list(MOCK_DATA)
+        data[INDEX_ROOM_1] = str(room)
+        answer_data = encode_frame("DAT", "R", data).strip()
+        if index in corrupt:
+            answer_data = answer_data[:-1] + (
+                b"1" if answer_data[-1:] == b"0" else b"0"
+            )
+        for request, answer in (
+            (encode_frame("INF", "R", [""]), encode_frame("INF", "R", MOCK_INFO)),
+            (encode_frame("DAT", "R", ["0"]), answer_data),
+            (encode_frame("DAT", "R", ["2"]), encode_frame("DAT", "R", MOCK_DATA2)),
+        ):
+            capture.record(FRAME_SENT, request.strip(), timestamp)
+            capture.record(FRAME_RECEIVED, answer.strip(), timestamp)
+    capture.close()
+
+
+def test_capture_round_trip(tmp_path):
+    """Test the dials of a capture are read back in order."""
+    path = tmp_path / "stove.cap"
+    _write_capture(path, range(200, 200 + DIALS))
+
+    dials = list(iter_dials(read_capture(path)))
+
+    assert [dial.data[INDEX_ROOM_1] for dial in dials] == [
+        str(room) for room in range(200, 200 + DIALS)
+    ]
+    assert dials[0].info == MOCK_INFO
+    assert dials[0].data2 == MOCK_DATA2
+    assert dials[1].timestamp - dials[0].timestamp == DIAL_INTERVAL
+
+
+def test_capture_appends(tmp_path):
+    """Test a capture reopened keeps its frames and header."""
+    path = tmp_path / "stove.cap"
+    _write_capture(path, [200])
+    _write_capture(path, [201])
+
+    assert path.read_bytes().count(CAPTURE_MAGIC) == 1
+    assert len(list(iter_dials(read_capture(path)))) == 2
+
+
+async def test_capture_writes_from_executor(tmp_path, monkeypatch):
+    """Test records are buffered on the event loop and written elsewhere."""
+    monkeypatch.setattr("custom_components.hottoh.capture._BUFFER_SIZE", 256)
+    path = tmp_path / "stove.cap"
+    capture = FrameCapture(path)
+    capture.open()
+    writers = set()
+    write = capture._write
+
+    def _write(chunk):
+        writers.add(threading.current_thread())
+        write(chunk)
+
+    capture._write = _write
+    frame = encode_frame("DAT", "R", list(MOCK_DATA))
+    for _ in range(DIALS * 10):
+        capture.record(FRAME_RECEIVED, frame)
+        await asyncio.sleep(0)
+    await capture.async_close()
+
+    assert writers and threading.current_thread() not in writers
+    assert len(list(read_capture(path))) == DIALS * 10
+
+
+def test_capture_truncated_and_corrupted(tmp_path):
+    """Test a cut record ends the capture and a corrupted answer skips its dial."""
+    path = tmp_path / "stove.cap"
+    _write_capture(path, range(200, 200 + DIALS), corrupt={0})
+    path.write_bytes(path.read_bytes()[:-10])
+
+    dials = list(iter_dials(read_capture(path)))
+
+    assert [dial.data[INDEX_ROOM_1] for dial in dials] == ["201", "202", "203"]
+
+
+def test_not_a_capture(tmp_path):
+    """Test other files are refused."""
+    path = tmp_path / "stove.cap"
+    path.write_bytes(b"")
+    with pytest.raises(HottohCaptureError):
+        list(read_capture(path))
+    path.write_bytes(b"garbage")
+    with pytest.raises(HottohCaptureError):
+        list(read_capture(path))
+
+
+async def test_replay_speed(tmp_path):
+    """Test dials are replayed at their recorded pace times speed."""
+    path = tmp_path / "stove.cap"
+    _write_capture(path, range(200, 200 + DIALS))
+    speed = DIAL_INTERVAL / 0.05
+
+    start = time.perf_counter()
+    dials = [dial async for dial in async_replay(path, speed)]
+    elapsed = time.perf_counter() - start
+
+    assert len(dials) == DIALS
+    assert (DIALS - 1) * 0.05 <= elapsed < (DIALS - 1) * 0.05 + 0.5
+
+
+async def test_capture_live_stove(hass, simulator, tmp_path):
+    """Test the capture service records the frames of a stove."""
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    path = tmp_path / "stove.cap"
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+        options={CONF_MIN_INTERVAL: 0.01, CONF_MAX_INTERVAL: 0.01},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+
+    await hass.services.async_call(
+        DOMAIN,
+        "start_capture",
+        {"config_entry_id": "test", "filename": str(path)},
+        blocking=True,
+    )
+    frames = client.stats.frames
+    async with asyncio.timeout(5):
+        while client.stats.frames < frames + 3:
+            await asyncio.sleep(0.01)
+    await hass.services.async_call(
+        DOMAIN, "stop_capture", {"config_entry_id": "test"}, blocking=True
+    )
+    assert client.capture is None
+
+    captured = list(read_capture(path))
+    assert {frame.direction for frame in captured} == {FRAME_SENT, FRAME_RECEIVED}
+    dials = list(iter_dials(captured))
+    assert len(dials) >= 2
+    assert dials[-1].data == simulator.data
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_capture_targets_one_stove(hass, mock_stove, tmp_path):
+    """Test the capture services act on the stove named in the call only."""
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    clients = {}
+    for entry_id, port in (("first", 5001), ("second", 5002)):
+        config_entry = MockConfigEntry(
+            domain=DOMAIN, data={**MOCK_CONFIG, CONF_PORT: port}, entry_id=entry_id
+        )
+        config_entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(entry_id)
+        await hass.async_block_till_done()
+        clients[entry_id] = hass.data[DOMAIN][entry_id][HOTTOH_SESSION].client
+        if entry_id == "first":
+            device = dr.async_get(hass).async_get_device({(DOMAIN, "Stove CMG")})
+            await hass.services.async_call(
+                DOMAIN,
+                "start_capture",
+                {"device_id": device.id, "filename": str(tmp_path / "first.cap")},
+                blocking=True,
+            )
+            assert clients["first"].capture is not None
+
+    await hass.services.async_call(
+        DOMAIN,
+        "start_capture",
+        {"config_entry_id": "second", "filename": str(tmp_path / "second.cap")},
+        blocking=True,
+    )
+    assert clients["second"].capture.path == tmp_path / "second.cap"
+    assert clients["first"].capture.path == tmp_path / "first.cap"
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(DOMAIN, "stop_capture", {}, blocking=True)
+    await hass.services.async_call(
+        DOMAIN, "stop_capture", {"config_entry_id": "second"}, blocking=True
+    )
+    assert clients["second"].capture is None
+    assert clients["first"].capture is not None
+
+    for entry_id in clients:
+        assert await hass.config_entries.async_unload(entry_id)
+
+
+async def test_replay_into_integration(hass, mock_stove, tmp_path):
+    """Test a capture replayed into the client updates the entities."""
+    path = tmp_path / "stove.cap"
+    _write_capture(path, range(200, 200 + DIALS))
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+
+    assert await async_replay_client(client, path, speed=None) == DIALS
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.stove_cmg_temperature_room_1").state == "20.4"
+
+
+async def test_replay_into_simulator(hass, simulator, tmp_path):
+    """Test the simulated stove answers with the registers of a capture."""
+    path = tmp_path / "stove.cap"
+    _write_capture(path, [200, 180])
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+        options={CONF_MIN_INTERVAL: 0.01, CONF_MAX_INTERVAL: 0.01},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    await simulator.async_replay(path, speed=None)
+    async with asyncio.timeout(5):
+        while hass.states.get("sensor.stove_cmg_temperature_room_1").state != "18.0":
+            await asyncio.sleep(0.01)
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
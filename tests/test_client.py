@@ -0,0 +1,223 @@
+"""Test the HottoH asyncio client."""
+
+import asyncio
+from functools import partial
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from custom_components.hottoh.client import (
+    RECONNECT_DELAY,
+    RECONNECT_MAX_DELAY,
+    ClientStats,
+    CommandQueue,
+    HottohAsyncClient,
+    HottohCommandError,
+    create_hottoh,
+)
+
+
+def test_command_queue_coalesces_writes():
+    """Test only the last write of a register is sent, after the debounce."""
+    queue = CommandQueue(debounce=0.5)
+    coalesced = [
+        queue.put(["3", str(value)], now=100.0 + value * 0.1) for value in range(10)
+    ]
+    assert not queue.put(["0", "1"], now=101.0)
+
+    # On/off is not debounced, the setpoint waits for the end of the drag
+    assert queue.pop_due(101.0) == [["0", "1"]]
+    assert queue.next_due() == 101.4
+    assert queue.pop_due(101.4) == [["3", "9"]]
+    assert coalesced.count(True) == 9
+    assert len(queue) == 0
+
+
+def test_command_queue_requeue_keeps_newer_values():
+    """Test writes put back after an error never override newer ones."""
+    queue = CommandQueue(debounce=0)
+    queue.put(["1", "1"], now=0)
+    queue.put(["8", "1"], now=0)
+    writes = queue.pop_due(0)
+    queue.put(["8", "0"], now=1)
+
+    queue.requeue(writes)
+
+    assert queue.values() == [["1", "1"], ["8", "0"]]
+
+
+def test_command_queue_debounce_does_not_hold_back_other_registers():
+    """Test immediate writes overtake a debounced write, due writes keep order."""
+    queue = CommandQueue(debounce=0.5)
+    queue.put(["3", "215"], now=0)
+    queue.put(["0", "0"], now=0.1)
+    queue.put(["1", "1"], now=0.2)
+
+    assert queue.pop_due(0.2) == [["0", "0"], ["1", "1"]]
+    assert queue.pop_due(0.5) == [["3", "215"]]
+
+
+async def test_requeued_writes_wake_the_client():
+    """Test writes put back after an error are sent without waiting a frame."""
+    client = create_hottoh("127.0.0.1", 5001).client
+    client._loop = asyncio.get_running_loop()
+    client._wakeup = asyncio.Event()
+    client._commands.requeue([["0", "1"]])
+
+    async with asyncio.timeout(1):
+        await client._async_wait(60)
+
+
+async def test_transaction_is_sent_back_to_back():
+    """Test a transaction supersedes pending writes and is sent as a group."""
+    hottoh = create_hottoh("127.0.0.1", 5001)
+    client = hottoh.client
+    client._loop = asyncio.get_running_loop()
+    client._wakeup = asyncio.Event()
+    sent = []
+
+    async def _request(command, mode, parameters):
+        sent.append(parameters)
+        return []
+
+    client._async_request = _request
+    hottoh.set_temperature(25)
+    hottoh.set_on()
+    transaction = asyncio.create_task(
+        client.async_run_transaction(
+            partial(hottoh.set_temperature, 18), hottoh.set_eco_mode_on
+        )
+    )
+    await asyncio.sleep(0)
+    await client._async_send_commands()
+    await transaction
+
+    assert sent == [["3", "180"], ["1", "1"], ["0", "1"]]
+
+
+async def test_transaction_reports_failure():
+    """Test a transaction fails as a whole when a write fails."""
+    hottoh = create_hottoh("127.0.0.1", 5001)
+    client = hottoh.client
+    client._loop = asyncio.get_running_loop()
+    client._wakeup = asyncio.Event()
+    client._async_request = AsyncMock(side_effect=[[], OSError("reset")])
+
+    transaction = asyncio.create_task(
+        client.async_run_transaction(hottoh.set_on, hottoh.set_eco_mode_on)
+    )
+    await asyncio.sleep(0)
+    with pytest.raises(OSError):
+        await client._async_send_commands()
+    with pytest.raises(HottohCommandError):
+        await transaction
+
+
+async def _wait_frames(client, count=1):
+    """Wait for count complete frames of client."""
+    received = asyncio.Event()
+    frames = 0
+
+    def _listener():
+        nonlocal frames
+        frames += 1
+        if frames >= count:
+            received.set()
+
+    remove = client.add_frame_listener(_listener)
+    try:
+        async with asyncio.timeout(5):
+            await received.wait()
+    finally:
+        remove()
+
+
+@pytest.fixture(name="hottoh")
+async def hottoh_fixture(simulator):
+    """Connect a session to the simulated stove."""
+    hottoh = create_hottoh("127.0.0.1", simulator.port)
+    hottoh.client.frame_interval = 0.01
+    hottoh.connect()
+    async with asyncio.timeout(5):
+        await hottoh.client.async_wait_first_frame()
+    yield hottoh
+    hottoh.disconnect()
+
+
+async def test_client_reads_simulated_stove(simulator, hottoh):
+    """Test the frames of the stove are decoded."""
+    assert hottoh.is_connected()
+    assert hottoh.get_name() == "Stove CMG"
+    assert hottoh.get_firmware() == "1.0.21"
+    assert hottoh.get_temperature_room_1() == 21.5
+    assert hottoh.getFanNumber() == 1
+
+
+async def test_client_writes_are_read_back(simulator, hottoh):
+    """Test a command reaches the stove and the next frame reads it back."""
+    await hottoh.client.async_run_transaction(
+        partial(hottoh.set_temperature, 19), hottoh.set_eco_mode_on
+    )
+    await _wait_frames(hottoh.client)
+
+    assert simulator.writes == [["3", "190"], ["1", "1"]]
+    assert hottoh.get_set_temperature_room_1() == 19.0
+    assert hottoh.get_eco_mode() is True
+
+
+async def test_client_reconnects_after_drop(simulator, hottoh):
+    """Test the client reconnects when the stove closes the connection."""
+    simulator.drop_connections()
+    simulator.tick()
+    await _wait_frames(hottoh.client)
+
+    assert simulator.connections == 2
+    assert hottoh.get_temperature_room_1() == 21.6
+
+
+@pytest.mark.parametrize(
+    "fault", ["crc_error_rate", "silence_rate", "disconnect_rate", "noise_rate"]
+)
+async def test_client_recovers_from_faults(simulator, hottoh, fault):
+    """Test the client goes on reading frames through injected faults."""
+    setattr(simulator, fault, 0.2)
+    await _wait_frames(hottoh.client, 20)
+
+    assert hottoh.get_name() == "Stove CMG"
+    if fault != "noise_rate":
+        assert simulator.connections > 1
+
+
+def test_client_stats():
+    """Test the counters keep a constant size."""
+    stats = ClientStats()
+    start = time.monotonic()
+    for latency in (0.005, 0.02, 0.02, 7.0):
+        stats.record_request(latency)
+    for second in range(90):
+        stats.record_frame(start + second)
+
+    assert stats.latency_histogram == [1, 2, 0, 0, 0, 0, 0, 0, 0, 1]
+    assert stats.mean_latency == (0.005 + 0.02 + 0.02 + 7.0) / 4
+    assert stats.frames == 90
+    assert stats.frames_per_minute(start + 90) == 60
+    assert stats.frames_per_minute(start + 200) == 0
+    assert stats.seconds_since_last_frame(start + 100) == 11
+
+
+def test_reconnect_delay_backs_off_with_jitter():
+    """Test reconnections slow down exponentially, capped and randomized."""
+    client = HottohAsyncClient("127.0.0.1", 5001)
+    delays = []
+    for failures in range(1, 12):
+        client._failures = failures
+        delays.append(client.reconnect_delay())
+
+    for failures, delay in enumerate(delays, start=1):
+        upper = min(RECONNECT_MAX_DELAY, RECONNECT_DELAY * 2 ** (failures - 1))
+        assert upper / 2 <= delay <= upper
+    assert max(delays) <= RECONNECT_MAX_DELAY
+    # Two stoves failing together do not retry together
+    client._failures = 3
+    assert len({client.reconnect_delay() for _ in range(10)}) > 1
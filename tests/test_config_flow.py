@@ -0,0 +1,117 @@
+"""Test HottoH config flow."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+from homeassistant.config_entries import SOURCE_DHCP, SOURCE_USER
+from homeassistant.const import CONF_HOST
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers.service_info.dhcp import DhcpServiceInfo
+
+from custom_components.hottoh import discovery
+from custom_components.hottoh.const import DOMAIN
+
+from .const import MOCK_CONFIG
+
+
+async def test_dhcp_discovery(hass, mock_stove):
+    """Test a module found by DHCP prefills the host."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": SOURCE_DHCP},
+        data=DhcpServiceInfo(
+            ip="127.0.0.1", hostname="hottoh", macaddress="c49300123456"
+        ),
+    )
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "manual"
+    schema = result["data_schema"]({})
+    assert schema[CONF_HOST] == "127.0.0.1"
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], MOCK_CONFIG
+    )
+    await hass.async_block_till_done()
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["result"].unique_id == "c4:93:00:12:34:56"
+
+    # Found again, the configured stove is not offered twice
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": SOURCE_DHCP},
+        data=DhcpServiceInfo(
+            ip="127.0.0.1", hostname="hottoh", macaddress="c49300123456"
+        ),
+    )
+    assert result["type"] is FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+
+
+async def test_scan_network(hass, socket_enabled):
+    """Test the scan step offers the hosts listening on the stove port."""
+    server = await asyncio.start_server(lambda r, w: w.close(), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_USER}
+    )
+    assert result["type"] is FlowResultType.MENU
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "scan"}
+    )
+    assert result["step_id"] == "scan"
+    with patch(
+        "custom_components.hottoh.config_flow.async_scan",
+        lambda network: discovery.async_scan(network, port),
+    ):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {"network": "127.0.0.1/32"}
+        )
+    server.close()
+    await server.wait_closed()
+
+    assert result["step_id"] == "pick"
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_HOST: "127.0.0.1"}
+    )
+    assert result["step_id"] == "manual"
+    assert result["data_schema"]({})[CONF_HOST] == "127.0.0.1"
+
+
+async def test_scan_invalid_network(hass):
+    """Test networks too large to scan are refused."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": SOURCE_USER}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "scan"}
+    )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"network": "10.0.0.0/8"}
+    )
+    assert result["errors"] == {"base": "invalid_network"}
+
+
+async def test_scan_is_concurrent():
+    """Test a /24 is probed with bounded concurrency."""
+    running = 0
+    peak = 0
+
+    async def _probe(host, port, timeout):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return host == "192.168.4.10"
+
+    with patch.object(discovery, "async_probe", _probe):
+        start = time.perf_counter()
+        found = await discovery.async_scan("192.168.4.0/24")
+        elapsed = time.perf_counter() - start
+
+    assert found == ["192.168.4.10"]
+    assert peak == discovery.SCAN_CONCURRENCY
+    # 254 hosts in 4 rounds of 64 probes
+    assert elapsed < 1
@@ -0,0 +1,246 @@
+"""Test the HottoH coordinator."""
+
+import asyncio
+from dataclasses import fields, replace
+from datetime import timedelta
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.hottoh.client import create_hottoh
+from custom_components.hottoh.const import DOMAIN
+from custom_components.hottoh.coordinator import (
+    STEADY_INTERVAL,
+    HottohDataUpdateCoordinator,
+    adaptive_interval,
+)
+from custom_components.hottoh.models import StoveState
+
+from .const import MOCK_CONFIG, MOCK_DATA, MOCK_DATA2, MOCK_INFO
+
+INDEX_ROOM_1 = 9
+FAST = 1.0
+SLOW = 60.0
+
+HEATING = StoveState(
+    **{
+        **dict.fromkeys((field.name for field in fields(StoveState)), None),
+        "action": "heating",
+        "mode": "on",
+        "is_on": True,
+        "smoke_temperature": 150.0,
+        "speed_fan_smoke": 1200.0,
+    }
+)
+
+
+@pytest.fixture(name="hottoh")
+def hottoh_fixture():
+    """Return a session that received the mock frame."""
+    hottoh = create_hottoh("127.0.0.1", 5001)
+    client = hottoh.client
+    client._info = list(MOCK_INFO)
+    client._data = list(MOCK_DATA)
+    client._data2 = list(MOCK_DATA2)
+    client._connected = True
+    client._first_frame = asyncio.Event()
+    return hottoh
+
+
+def _coordinator(hass, hottoh, **kwargs):
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    return HottohDataUpdateCoordinator(hass, config_entry, hottoh, **kwargs)
+
+
+@pytest.mark.parametrize(
+    ("state", "previous", "elapsed", "expected"),
+    [
+        (HEATING, None, 0, STEADY_INTERVAL),
+        (HEATING, HEATING, STEADY_INTERVAL, STEADY_INTERVAL),
+        (replace(HEATING, action="ignition"), HEATING, 1, FAST),
+        (replace(HEATING, action="stopping", is_on=False), None, 0, FAST),
+        (replace(HEATING, action="off", is_on=True), None, 0, FAST),
+        (
+            replace(HEATING, action="off"),
+            replace(HEATING, action="off"),
+            STEADY_INTERVAL,
+            SLOW,
+        ),
+        (replace(HEATING, smoke_temperature=152.0), HEATING, STEADY_INTERVAL, FAST),
+        (
+            replace(HEATING, smoke_temperature=150.5),
+            HEATING,
+            STEADY_INTERVAL,
+            STEADY_INTERVAL,
+        ),
+        (replace(HEATING, smoke_temperature=151.0), HEATING, 1, STEADY_INTERVAL),
+        (replace(HEATING, speed_fan_smoke=1400.0), HEATING, STEADY_INTERVAL, FAST),
+        (
+            replace(HEATING, speed_fan_smoke=1220.0),
+            HEATING,
+            STEADY_INTERVAL,
+            STEADY_INTERVAL,
+        ),
+        (
+            replace(HEATING, action="off", is_on=False, smoke_temperature=120.0),
+            HEATING,
+            STEADY_INTERVAL,
+            SLOW,
+        ),
+        (replace(HEATING, action="off", is_on=False), None, 0, SLOW),
+        (replace(HEATING, action="idle"), HEATING, STEADY_INTERVAL, SLOW),
+        (
+            replace(HEATING, smoke_temperature=None),
+            HEATING,
+            STEADY_INTERVAL,
+            STEADY_INTERVAL,
+        ),
+    ],
+)
+def test_adaptive_interval(state, previous, elapsed, expected):
+    """Test frames are read faster during transitions, slower at rest."""
+    assert adaptive_interval(state, previous, elapsed, FAST, SLOW) == expected
+
+
+def test_adaptive_interval_within_bounds():
+    """Test the steady interval follows the configured bounds."""
+    assert adaptive_interval(HEATING, None, 0, FAST, 5.0) == 5.0
+    assert adaptive_interval(HEATING, None, 0, 20.0, SLOW) == 20.0
+
+
+async def test_adaptive_interval_ignores_jitter(hass, hottoh):
+    """Test a steady stove with jittery readings keeps the steady interval."""
+    coordinator = _coordinator(hass, hottoh, min_interval=FAST, max_interval=SLOW)
+
+    now = time.monotonic()
+    for second in range(30):
+        jitter = 0.1 if second % 2 else -0.1
+        state = replace(HEATING, smoke_temperature=150.0 + jitter)
+        with patch(
+            "custom_components.hottoh.coordinator.time.monotonic",
+            return_value=now + second,
+        ):
+            coordinator._adapt_interval(state)
+        assert coordinator.interval == STEADY_INTERVAL
+
+
+async def test_commands_are_read_back_fast(hass, hottoh):
+    """Test a command is read at the fast interval until its rollback."""
+    coordinator = _coordinator(
+        hass, hottoh, confirm_timeout=5, min_interval=FAST, max_interval=SLOW
+    )
+    off = replace(HEATING, action="off", is_on=False, mode="off")
+    with patch.object(StoveState, "from_hottoh", return_value=off):
+        coordinator._async_handle_frame()
+        assert coordinator.interval == SLOW
+
+        coordinator.async_set_optimistic(is_on=True)
+        assert hottoh.client.frame_interval == FAST
+        coordinator._async_handle_frame()
+        assert coordinator.interval == FAST
+
+        # The value is kept for the frame interval it was sent at
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+        await hass.async_block_till_done()
+        assert coordinator.data.is_on is True
+
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=SLOW + 1))
+        await hass.async_block_till_done()
+        assert coordinator.data.is_on is False
+        coordinator._async_handle_frame()
+        assert coordinator.interval == SLOW
+
+    await coordinator.async_shutdown()
+
+
+async def test_one_snapshot_per_refresh(hass, hottoh):
+    """Test one refresh reads the stove once for all the listening entities."""
+    coordinator = _coordinator(hass, hottoh)
+    updates = {"climate": 0, "sensor": 0}
+    for platform in updates:
+        coordinator.async_add_listener(
+            lambda platform=platform: updates.__setitem__(
+                platform, updates[platform] + 1
+            )
+        )
+
+    hottoh.client._data[INDEX_ROOM_1] = "230"
+    with patch.object(
+        StoveState, "from_hottoh", wraps=StoveState.from_hottoh
+    ) as from_hottoh:
+        await coordinator.async_refresh()
+
+    from_hottoh.assert_called_once()
+    assert updates == {"climate": 1, "sensor": 1}
+    assert coordinator.data.temperature_room_1 == 23.0
+
+    await coordinator.async_shutdown()
+
+
+async def test_frames_are_pushed(hass, hottoh):
+    """Test a complete frame updates the entities, without any polling."""
+    client = hottoh.client
+    registers = {"INF": list(MOCK_INFO), "DAT0": list(MOCK_DATA)}
+    registers["DAT0"][INDEX_ROOM_1] = "230"
+
+    async def _request(command, mode, parameters):
+        return registers.get(command + parameters[0], list(MOCK_DATA2))
+
+    client._async_request = _request
+    coordinator = _coordinator(hass, hottoh)
+    assert coordinator.update_interval is None
+    updates = []
+    coordinator.async_add_listener(lambda: updates.append(coordinator.data))
+    coordinator.async_start_push()
+
+    await client._async_dial()
+
+    assert [data.temperature_room_1 for data in updates] == [23.0]
+
+    coordinator.async_stop_push()
+
+
+async def test_only_changed_entities_write(hass, hottoh):
+    """Test a frame only wakes the entities reading a field that changed."""
+    client = hottoh.client
+    registers = {"INF": list(MOCK_INFO), "DAT0": list(MOCK_DATA)}
+
+    async def _request(command, mode, parameters):
+        return list(registers.get(command + parameters[0], MOCK_DATA2))
+
+    client._async_request = _request
+    coordinator = _coordinator(hass, hottoh)
+    await coordinator.async_refresh()
+    coordinator.async_start_push()
+    written = []
+    for entity, fields in (
+        ("climate", {"action", "temperature_room_1", "set_temperature_room_1"}),
+        ("temperature_room_1", {"temperature_room_1", "set_temperature_room_1"}),
+        ("smoke_temperature", {"smoke_temperature"}),
+        ("is_on", {"is_on"}),
+    ):
+        coordinator.async_add_listener(
+            lambda entity=entity: written.append(entity), frozenset(fields)
+        )
+
+    await client._async_dial()
+    assert written == []
+    assert coordinator.changed_fields == frozenset()
+    assert (coordinator.state_writes, coordinator.skipped_writes) == (0, 4)
+
+    registers["DAT0"][INDEX_ROOM_1] = "230"
+    await client._async_dial()
+
+    assert coordinator.changed_fields == {"temperature_room_1"}
+    assert written == ["climate", "temperature_room_1"]
+    assert (coordinator.state_writes, coordinator.skipped_writes) == (2, 6)
+
+    coordinator.async_stop_push()
@@ -0,0 +1,59 @@
+"""Test HottoH diagnostics."""
+
+import asyncio
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.components.diagnostics import REDACTED
+from homeassistant.const import CONF_PORT
+from homeassistant.helpers import entity_registry as er
+
+from custom_components.hottoh.const import (
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    COORDINATOR,
+    DOMAIN,
+)
+from custom_components.hottoh.diagnostics import async_get_config_entry_diagnostics
+
+from .const import MOCK_CONFIG
+
+
+async def test_diagnostics(hass, simulator):
+    """Test diagnostics report the health of the connection."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+        options={CONF_MIN_INTERVAL: 0.01, CONF_MAX_INTERVAL: 0.01},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN]["test"][COORDINATOR].api.client
+
+    simulator.crc_error_rate = 0.3
+    async with asyncio.timeout(5):
+        while client.stats.crc_errors < 2 or not client.is_connected():
+            await asyncio.sleep(0.01)
+    simulator.crc_error_rate = 0
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert diagnostics["entry"]["data"]["host"] == REDACTED
+    assert diagnostics["entry"]["options"][CONF_MIN_INTERVAL] == 0.01
+    assert diagnostics["capabilities"]["name"] == "Stove CMG"
+    stats = diagnostics["client"]
+    assert stats["crc_errors"] >= 2
+    assert stats["reconnects"] >= 2
+    assert stats["frames"] >= 1
+    assert sum(stats["latency_histogram"].values()) == stats["requests"]
+    assert stats["seconds_since_last_frame"] >= 0
+    assert stats["coalesced_writes"] == 0
+    assert diagnostics["coordinator"]["interval"] == 0.01
+
+    # Diagnostic sensors are polled, and disabled until the user needs them
+    entry = er.async_get(hass).async_get("sensor.stove_cmg_crc_errors")
+    assert entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
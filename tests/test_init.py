@@ -0,0 +1,358 @@
+"""Test HottoH setup."""
+
+import asyncio
+from datetime import timedelta
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_PORT, EVENT_STATE_CHANGED, STATE_UNAVAILABLE
+from homeassistant.core import callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from custom_components.hottoh import (
+    async_cache_session,
+    async_connect_or_timeout,
+    async_pop_session,
+)
+from custom_components.hottoh.client import HottohAsyncClient, create_hottoh
+from custom_components.hottoh.const import (
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    DOMAIN,
+    HOTTOH_SESSION,
+    SESSION_CACHE,
+    SESSION_CACHE_TIMEOUT,
+)
+
+from .const import MOCK_CONFIG, MOCK_DATA, MOCK_DATA2, MOCK_INFO
+from .simulator import StoveSimulator
+
+STOVE_RESPONSE_TIME = 0.05
+
+CAPABILITIES = {
+    "name": "Stove CMG",
+    "firmware": "1.0.21",
+    "manufacturer": "CMG",
+    "fan_number": 1,
+    "temp_room_1": True,
+    "temp_room_2": False,
+    "temp_room_3": False,
+    "temp_water": False,
+    "pump": False,
+}
+
+
+async def test_setup_waits_for_first_frame_only(hass):
+    """Test setup is ready as soon as the stove sent its first frame."""
+
+    def _start(client):
+        client._loop = asyncio.get_running_loop()
+        client._wakeup = asyncio.Event()
+        client._first_frame = asyncio.Event()
+        client._connected = True
+
+        def _first_frame():
+            client._info = list(MOCK_INFO)
+            client._data = list(MOCK_DATA)
+            client._data2 = list(MOCK_DATA2)
+            client._first_frame.set()
+
+        client._loop.call_later(STOVE_RESPONSE_TIME, _first_frame)
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    with patch.object(HottohAsyncClient, "start", _start):
+        start = time.perf_counter()
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        elapsed = time.perf_counter() - start
+        await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert STOVE_RESPONSE_TIME <= elapsed < STOVE_RESPONSE_TIME + 0.5
+
+
+async def test_setup_adopts_config_flow_session(hass, mock_stove):
+    """Test the entry set up after the config flow reuses its connection."""
+    clients = []
+    start = HottohAsyncClient.start
+
+    def _start(client):
+        clients.append(client)
+        start(client)
+
+    with patch.object(HottohAsyncClient, "start", _start):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": "user"}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {"next_step_id": "manual"}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], MOCK_CONFIG
+        )
+        await hass.async_block_till_done()
+
+    config_entry = result["result"]
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert len(clients) == 1
+    session = hass.data[DOMAIN][config_entry.entry_id][HOTTOH_SESSION]
+    assert session.client is clients[0]
+    assert not hass.data[DOMAIN][SESSION_CACHE]
+
+
+async def test_unused_session_is_disconnected(hass, mock_stove):
+    """Test a validated session no entry adopts is closed."""
+    hottoh = create_hottoh("127.0.0.1", 5001)
+    await async_connect_or_timeout(hass, hottoh)
+    async_cache_session(hass, hottoh)
+
+    with patch.object(hottoh.client, "stop") as stop:
+        async_fire_time_changed(
+            hass, dt_util.utcnow() + timedelta(seconds=SESSION_CACHE_TIMEOUT + 1)
+        )
+        await hass.async_block_till_done()
+
+    stop.assert_called_once()
+    assert async_pop_session(hass, "127.0.0.1", 5001) is None
+
+
+async def test_failed_first_refresh_stops_client(hass, mock_stove):
+    """Test the client is stopped when the stove fails its first refresh."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+
+    with (
+        patch(
+            "custom_components.hottoh.coordinator."
+            "HottohDataUpdateCoordinator._async_update_data",
+            side_effect=UpdateFailed("stove"),
+        ),
+        patch.object(HottohAsyncClient, "stop", autospec=True) as stop,
+    ):
+        assert not await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.SETUP_RETRY
+    stop.assert_called_once()
+
+
+async def test_setup_saves_capabilities(hass, hass_storage, mock_stove):
+    """Test the capabilities of a new stove are saved once it answered."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    capabilities = hass_storage[f"{DOMAIN}.test"]["data"]
+    assert capabilities["fan_number"] == 1
+    assert capabilities["temp_room_1"] is True
+    assert capabilities["pump"] is False
+
+
+async def test_setup_from_saved_capabilities(hass, hass_storage):
+    """Test a known stove gets its entities before its first frame."""
+    hass_storage[f"{DOMAIN}.test"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.test",
+        "data": CAPABILITIES,
+    }
+    clients = []
+
+    def _start(client):
+        client._loop = asyncio.get_running_loop()
+        client._wakeup = asyncio.Event()
+        client._first_frame = asyncio.Event()
+        client._connected = True
+        clients.append(client)
+
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    with patch.object(HottohAsyncClient, "start", _start):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    states = hass.states.async_all("sensor")
+    assert states
+    assert all(state.state == STATE_UNAVAILABLE for state in states)
+
+    client = clients[0]
+    client._info = list(MOCK_INFO)
+    client._data = list(MOCK_DATA)
+    client._data2 = list(MOCK_DATA2)
+    client._first_frame.set()
+    await hass.async_block_till_done()
+
+    states = hass.states.async_all("sensor")
+    assert all(state.state != STATE_UNAVAILABLE for state in states)
+    assert config_entry.state is ConfigEntryState.LOADED
+
+
+async def test_setup_with_simulated_stove(hass, simulator):
+    """Test the integration against a stove speaking the real protocol."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert hass.states.get("sensor.stove_cmg_temperature_room_1").state == "21.5"
+
+    await hass.services.async_call(
+        "climate",
+        "set_temperature",
+        {"entity_id": "climate.stove_cmg", "temperature": 19},
+        blocking=True,
+    )
+    async with asyncio.timeout(5):
+        while simulator.writes != [["3", "190.0"]]:
+            await asyncio.sleep(0.05)
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_entities_follow_the_connection(hass, simulator):
+    """Test entities go unavailable together while the stove is unreachable."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+        options={CONF_MIN_INTERVAL: 0.01, CONF_MAX_INTERVAL: 0.01},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    entity_ids = hass.states.async_entity_ids()
+    changes = []
+
+    @callback
+    def _state_changed(event):
+        changes.append(event.data["new_state"].state == STATE_UNAVAILABLE)
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+
+    simulator.refuse_connections = True
+    simulator.drop_connections()
+    async with asyncio.timeout(5):
+        while not all(
+            hass.states.get(entity_id).state == STATE_UNAVAILABLE
+            for entity_id in entity_ids
+        ):
+            await asyncio.sleep(0.01)
+    # Every entity is written once, in the same batch
+    assert changes == [True] * len(entity_ids)
+
+    simulator.refuse_connections = False
+    async with asyncio.timeout(5):
+        while hass.states.get("climate.stove_cmg").state == STATE_UNAVAILABLE:
+            await asyncio.sleep(0.01)
+    assert hass.states.get("sensor.stove_cmg_temperature_room_1").state == "21.5"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_firmware_update_refreshes_device(hass, mock_stove):
+    """Test entities pick up a new firmware, without reading it on every frame."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+
+    client.handle_frame(list(MOCK_INFO), list(MOCK_DATA), list(MOCK_DATA2))
+    await hass.async_block_till_done()
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "Stove CMG")})
+    assert device.sw_version == "1.0.21"
+
+    info = list(MOCK_INFO)
+    info[1] = "1.0.22"
+    # The stove keeps sending the new firmware after the reload
+    with patch("tests.conftest.MOCK_INFO", info):
+        client.handle_frame(info, list(MOCK_DATA), list(MOCK_DATA2))
+        await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "Stove CMG")})
+    assert device.sw_version == "1.0.22"
+
+
+async def test_reload_is_fast(hass, simulator):
+    """Test a reload closes the session and sets up again without waiting."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    old_client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+
+    start = time.perf_counter()
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    elapsed = time.perf_counter() - start
+    await hass.async_block_till_done()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert not old_client.is_connected()
+    assert old_client._task is None
+    assert elapsed < 1.0, f"reload took {elapsed:.3f} s"
+    # Set up from the saved capabilities, the stove answers in the background
+    client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+    async with asyncio.timeout(5):
+        await client.async_wait_first_frame()
+    assert simulator.connections == 2
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_unload_reports_any_failed_platform(hass, mock_stove):
+    """Test platforms unload together and one failure fails the unload."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    forward_entry_unload = hass.config_entries.async_forward_entry_unload
+
+    async def _unload(entry, platform):
+        if platform == "sensor":
+            return False
+        return await forward_entry_unload(entry, platform)
+
+    with patch.object(hass.config_entries, "async_forward_entry_unload", _unload):
+        assert not await hass.config_entries.async_unload(config_entry.entry_id)
+
+    assert DOMAIN in hass.data and "test" in hass.data[DOMAIN]
+
+
+@pytest.mark.parametrize(("pump", "binary_sensor"), [(False, False), (True, True)])
+async def test_platforms_follow_capabilities(hass, socket_enabled, pump, binary_sensor):
+    """Test the binary sensor platform is only set up for stoves with a pump."""
+    async with StoveSimulator(pump=pump) as simulator:
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+            entry_id="test",
+        )
+        config_entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        assert ("hottoh.binary_sensor" in hass.config.components) is binary_sensor
+        assert bool(hass.states.async_all("binary_sensor")) is binary_sensor
+        assert "hottoh.sensor" in hass.config.components
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
@@ -0,0 +1,57 @@
+"""Test the HottoH data models."""
+
+from dataclasses import FrozenInstanceError, replace
+
+import pytest
+
+from custom_components.hottoh.client import create_hottoh
+from custom_components.hottoh.models import StoveCapabilities, StoveState
+
+from .const import MOCK_DATA, MOCK_DATA2, MOCK_INFO
+
+
+@pytest.fixture(name="hottoh")
+def hottoh_fixture():
+    """Return a session that received the mock frame."""
+    hottoh = create_hottoh("127.0.0.1", 5001)
+    client = hottoh.client
+    client._info, client._data, client._data2 = MOCK_INFO, MOCK_DATA, MOCK_DATA2
+    return hottoh
+
+
+def test_state_from_frame(hottoh):
+    """Test a frame is decoded into typed values."""
+    state = StoveState.from_hottoh(hottoh)
+
+    assert state.name == "Stove CMG"
+    assert state.temperature_room_1 == 21.5
+    assert state.set_temperature_room_1 == 22.0
+    with pytest.raises(FrozenInstanceError):
+        state.temperature_room_1 = 20.0
+
+
+def test_state_before_first_frame():
+    """Test the values a session cannot read yet decode to None."""
+    state = StoveState.from_hottoh(create_hottoh("127.0.0.1", 5001))
+
+    assert state.name is None
+    assert state.firmware is None
+
+
+def test_state_diff(hottoh):
+    """Test diff names the fields that changed."""
+    state = StoveState.from_hottoh(hottoh)
+    changed = replace(state, temperature_room_1=22.5, action="stopping")
+
+    assert state.diff(state) == frozenset()
+    assert changed.diff(state) == {"temperature_room_1", "action"}
+
+
+def test_capabilities_from_frame(hottoh):
+    """Test the capabilities of the mock stove."""
+    capabilities = StoveCapabilities.from_hottoh(hottoh)
+
+    assert capabilities.name == "Stove CMG"
+    assert capabilities.fan_number == 1
+    assert capabilities.temp_room_1
+    assert not capabilities.temp_water
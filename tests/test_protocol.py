@@ -0,0 +1,46 @@
+"""Test the HottoH frame encoding."""
+
+import pytest
+
+from custom_components.hottoh.protocol import (
+    HottohCrcError,
+    HottohProtocolError,
+    crc16,
+    encode_frame,
+    parse_frame,
+)
+
+
+def test_crc16():
+    """Test the CRC is CCITT-FALSE."""
+    assert crc16(b"123456789") == 0x29B1
+
+
+def test_frame_round_trip():
+    """Test an encoded frame decodes to the same command and parameters."""
+    raw = encode_frame("DAT", "W", ["3", "215"], socket_id=7)
+
+    assert raw.startswith(b"#00007C---0006DATW3;215;")
+    frame = parse_frame(raw)
+    assert (frame.command, frame.mode, frame.parameters, frame.socket_id) == (
+        "DAT",
+        "W",
+        ["3", "215"],
+        7,
+    )
+
+
+@pytest.mark.parametrize(
+    ("raw", "error"),
+    [
+        (encode_frame("DAT")[:-2] + b"0\n", HottohCrcError),
+        (encode_frame("DAT")[:-5] + b"ZZZZ\n", HottohCrcError),
+        (encode_frame("DAT")[1:], HottohProtocolError),
+        (encode_frame("DAT")[:-3], HottohProtocolError),
+        (b"#0000xC---0002DATR0;1A2B", HottohProtocolError),
+    ],
+)
+def test_invalid_frames(raw, error):
+    """Test malformed frames are refused."""
+    with pytest.raises(error):
+        parse_frame(raw)
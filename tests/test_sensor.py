@@ -0,0 +1,181 @@
+"""Test HottoH sensors."""
+
+from datetime import timedelta
+import time
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from homeassistant.components.recorder.db_schema import StateAttributes
+from homeassistant.const import CONF_PORT, EVENT_STATE_CHANGED
+from homeassistant.core import Event
+from homeassistant.helpers.json import json_loads
+from homeassistant.util import dt as dt_util
+
+from custom_components.hottoh.const import (
+    CONF_MAX_AGE,
+    COORDINATOR,
+    DOMAIN,
+    HOTTOH_SESSION,
+)
+from custom_components.hottoh.sensor import is_significant
+
+from .const import MOCK_CONFIG, MOCK_DATA, MOCK_DATA2, MOCK_INFO
+from .simulator import INDEX_ROOM_1, INDEX_ROOM_1_SET, StoveSimulator
+
+
+@pytest.mark.parametrize(
+    ("capabilities", "present", "absent"),
+    [
+        (
+            {},
+            ["temperature_room_1", "speed_fan_1", "air_ex_1"],
+            ["temperature_room_2", "water_temperature", "speed_fan_2"],
+        ),
+        (
+            {"room_2": True, "water": True},
+            ["temperature_room_2", "water_temperature", "speed_fan_1"],
+            ["temperature_room_3", "speed_fan_2"],
+        ),
+    ],
+)
+async def test_sensors_follow_capabilities(
+    hass, socket_enabled, capabilities, present, absent
+):
+    """Test the sensors of the table are created for the stove capabilities."""
+    async with StoveSimulator(**capabilities) as simulator:
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={**MOCK_CONFIG, CONF_PORT: simulator.port},
+            entry_id="test",
+        )
+        config_entry.add_to_hass(hass)
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        for key in ("action", "smoke_temperature", "power_level", *present):
+            assert hass.states.get(f"sensor.stove_cmg_{key}") is not None, key
+        for key in absent:
+            assert hass.states.get(f"sensor.stove_cmg_{key}") is None, key
+
+        state = hass.states.get("sensor.stove_cmg_temperature_room_1")
+        assert state.state == "21.5"
+        assert state.attributes["set_value"] == 22.0
+        assert hass.states.get("sensor.stove_cmg_action").state == "heating"
+
+        assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_limits_are_not_recorded(hass, mock_stove):
+    """Test the recorder keeps the setpoint of a sensor but not its limits."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.stove_cmg_temperature_room_1")
+    assert {"set_value", "min_value", "max_value"} <= state.attributes.keys()
+
+    recorded = json_loads(
+        StateAttributes.shared_attrs_bytes_from_event(
+            Event(EVENT_STATE_CHANGED, {"new_state": state}), None
+        )
+    )
+
+    assert recorded["set_value"] == 22.0
+    assert "min_value" not in recorded
+    assert "max_value" not in recorded
+
+
+@pytest.mark.parametrize(
+    ("old", "new", "deadband", "relative", "expected"),
+    [
+        (21.5, 21.6, 0.2, False, False),
+        (21.5, 21.7, 0.2, False, True),
+        (20.0, 20.2, 0.2, False, True),
+        (21.5, 21.5, 0, False, False),
+        (21.5, 21.6, 0, False, True),
+        (1000, 1040, 5, True, False),
+        (1000, 1050, 5, True, True),
+        (0, 10, 5, True, True),
+        (None, 21.5, 0.2, False, True),
+        ("heating", "stopping", 0, False, True),
+    ],
+)
+def test_is_significant(old, new, deadband, relative, expected):
+    """Test changes are significant from their deadband on."""
+    assert is_significant(old, new, deadband, relative) is expected
+
+
+async def test_deadband_suppresses_jitter(hass, mock_stove):
+    """Test a sensor is only written once its value moved past its deadband."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_MAX_AGE: 60}, entry_id="test"
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+    coordinator = hass.data[DOMAIN]["test"][COORDINATOR]
+    entity_id = "sensor.stove_cmg_temperature_room_1"
+
+    def _frame(room, setpoint="220"):
+        data = list(MOCK_DATA)
+        data[INDEX_ROOM_1] = room
+        data[INDEX_ROOM_1_SET] = setpoint
+        client.handle_frame(list(MOCK_INFO), data, list(MOCK_DATA2))
+
+    _frame("216")
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "21.5"
+    assert coordinator.suppressed_writes == 1
+
+    _frame("218")
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "21.8"
+
+    # A new setpoint is written right away
+    _frame("219", "230")
+    await hass.async_block_till_done()
+    state = hass.states.get(entity_id)
+    assert state.state == "21.9"
+    assert state.attributes["set_value"] == 23.0
+
+    monotonic = time.monotonic() + 61
+    with patch(
+        "custom_components.hottoh.sensor.time.monotonic", return_value=monotonic
+    ):
+        _frame("218", "230")
+        await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "21.8"
+
+
+async def test_max_age_without_frames(hass, mock_stove):
+    """Test a suppressed value is written once max age passed, frames or not."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_CONFIG, options={CONF_MAX_AGE: 60}, entry_id="test"
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN]["test"][HOTTOH_SESSION].client
+    entity_id = "sensor.stove_cmg_temperature_room_1"
+
+    data = list(MOCK_DATA)
+    data[INDEX_ROOM_1] = "216"
+    client.handle_frame(list(MOCK_INFO), data, list(MOCK_DATA2))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "21.5"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "21.5"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == "21.6"
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
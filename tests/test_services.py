@@ -0,0 +1,66 @@
+"""Test HottoH services."""
+
+import asyncio
+import time
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.hottoh.const import DOMAIN, HOTTOH_SESSION
+
+from .const import MOCK_CONFIG
+
+SERVICES = [
+    ("set_temperature", {"value": 21.5}),
+    ("set_power_level", {"value": 3}),
+    ("set_speed_fan_1", {"value": 4}),
+    ("eco_mode_turn_on", {}),
+    ("eco_mode_turn_off", {}),
+    ("chrono_mode_turn_on", {}),
+    ("chrono_mode_turn_off", {}),
+    ("turn_on", {}),
+    ("turn_off", {}),
+]
+
+
+async def test_services_do_not_stall_event_loop(hass, mock_stove):
+    """Test calling services in bulk never blocks the event loop."""
+    config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    client = hass.data[DOMAIN][config_entry.entry_id][HOTTOH_SESSION].client
+
+    # Measure how late a 1 ms ticker wakes up while the services run
+    stalls = []
+    running = True
+
+    async def _ticker():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stalls.append(time.perf_counter() - start - 0.001)
+
+    ticker = asyncio.create_task(_ticker())
+    await asyncio.sleep(0)
+    for _ in range(50):
+        await asyncio.gather(
+            *(
+                hass.services.async_call(DOMAIN, service, data, blocking=True)
+                for service, data in SERVICES
+            )
+        )
+    running = False
+    await ticker
+
+    assert stalls
+    assert max(stalls) < 0.1
+    # Writes to the same register are coalesced, the last one wins
+    assert client._commands.values() == [
+        ["3", "215.0"],
+        ["2", "3"],
+        ["5", "4"],
+        ["1", "0"],
+        ["8", "0"],
+        ["0", "0"],
+    ]
+    assert client.stats.coalesced_writes == 50 * len(SERVICES) - 6
@@ -0,0 +1,79 @@
+"""Test HottoH switches."""
+
+from datetime import timedelta
+
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.util import dt as dt_util
+
+from custom_components.hottoh.const import (
+    CONF_CONFIRM_TIMEOUT,
+    COORDINATOR,
+    DOMAIN,
+    HOTTOH_SESSION,
+)
+
+from .const import MOCK_CONFIG
+
+
+async def _setup(hass):
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=MOCK_CONFIG,
+        options={CONF_CONFIRM_TIMEOUT: 5},
+        entry_id="test",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    domain_data = hass.data[DOMAIN][config_entry.entry_id]
+    (entity_id,) = [
+        state.entity_id
+        for state in hass.states.async_all("switch")
+        if state.entity_id.endswith("is_eco_mode")
+    ]
+    return domain_data[HOTTOH_SESSION].client, domain_data[COORDINATOR], entity_id
+
+
+async def test_switch_optimistic_rollback(hass, mock_stove):
+    """Test a command the stove never confirms is rolled back."""
+    _, coordinator, entity_id = await _setup(hass)
+    assert hass.states.get(entity_id).state == STATE_OFF
+    timeout = max(coordinator.confirm_timeout, coordinator.interval)
+
+    await hass.services.async_call(
+        "switch", "turn_on", {"entity_id": entity_id}, blocking=True
+    )
+    assert hass.states.get(entity_id).state == STATE_ON
+
+    # A frame that does not read the value back yet keeps it
+    coordinator._async_handle_frame()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_ON
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=timeout + 1))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_OFF
+    assert coordinator.rolled_back == 1
+
+
+async def test_switch_optimistic_confirmed(hass, mock_stove):
+    """Test a command read back by the stove is kept after the timeout."""
+    client, coordinator, entity_id = await _setup(hass)
+
+    await hass.services.async_call(
+        "switch", "turn_on", {"entity_id": entity_id}, blocking=True
+    )
+    client._data[7] = "1"
+    coordinator._async_handle_frame()
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_ON
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=6))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_ON
+    assert coordinator.rolled_back == 0